@@ -0,0 +1,441 @@
+"""HTTP load benchmark for the API.
+
+Seeds a dedicated database, starts uvicorn against it (or targets ``--url``),
+drives a mixed workload from concurrent virtual users and reports throughput
+and latency percentiles per route. Results are written as JSON so runs on
+different commits can be compared:
+
+    cd backend
+    python -m benchmarks.load --database bench_db --duration 30 --concurrency 20
+    USE_ASYNC_DB=true python -m benchmarks.load --database bench_db --server-workers 4
+
+The database named by --database is created if missing and emptied before
+seeding, it has to differ from the app's DB_NAME and the server started here
+is pointed at it.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import httpx
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import URL, make_url
+from core.config import SQLALCHEMY_DATABASE_URL, USE_ASYNC_DB, db_name
+from core.hashing import _hash
+from core.migrations import run_migrations
+from database import Base
+from models import User, Project, Task, project_users, project_managers
+
+PASSWORD = "bench-password"
+DEFAULT_MIX = "login=5,list_projects=20,list_tasks=45,update_task=25,add_member=5"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def user_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def spare_email(index: int) -> str:
+    return f"spare{index}@example.com"
+
+
+class Plan:
+    """What gets seeded, so virtual users know their projects and task ids
+    without asking the API."""
+
+    def __init__(self, args):
+        rng = random.Random(args.seed)
+        self.users = args.users
+        self.spare_users = args.spare_users
+        self.tasks_per_project = args.tasks_per_project
+        # project ids and task ids are sequential after RESTART IDENTITY
+        self.creators = {
+            p: (p - 1) % args.users + 1 for p in range(1, args.projects + 1)
+        }
+        self.members = {}
+        for project_id, creator in self.creators.items():
+            others = rng.sample(
+                [u for u in range(1, args.users + 1) if u != creator],
+                min(args.members_per_project, args.users) - 1,
+            )
+            self.members[project_id] = [creator, *others]
+        self.projects_of = defaultdict(list)
+        for project_id, members in self.members.items():
+            for user_id in members:
+                self.projects_of[user_id].append(project_id)
+
+    def task_ids(self, project_id: int) -> range:
+        first = (project_id - 1) * self.tasks_per_project + 1
+        return range(first, first + self.tasks_per_project)
+
+
+def database_url(database: str) -> URL:
+    return make_url(SQLALCHEMY_DATABASE_URL).set(database=database)
+
+
+def ensure_database(url: URL):
+    admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        exists = connection.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            {"name": url.database},
+        )
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{url.database}"'))
+    admin.dispose()
+
+
+def seed(url: URL, plan: Plan):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    hashed_password = _hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        users = [
+            {"email": user_email(i), "username": f"bench{i}"}
+            for i in range(1, plan.users + 1)
+        ] + [
+            {"email": spare_email(i), "username": f"spare{i}"}
+            for i in range(plan.spare_users)
+        ]
+        connection.execute(
+            insert(User.__table__),
+            [{**user, "hashed_password": hashed_password} for user in users],
+        )
+        connection.execute(
+            insert(Project.__table__),
+            [
+                {"title": f"project {p}", "description": "", "creator_id": creator}
+                for p, creator in plan.creators.items()
+            ],
+        )
+        connection.execute(
+            insert(project_users),
+            [
+                {"project_id": p, "user_id": u}
+                for p, members in plan.members.items()
+                for u in members
+            ],
+        )
+        connection.execute(
+            insert(project_managers),
+            [{"project_id": p, "user_id": c} for p, c in plan.creators.items()],
+        )
+        for project_id, members in plan.members.items():
+            connection.execute(
+                insert(Task.__table__),
+                [
+                    {
+                        "title": f"task {i} of project {project_id}",
+                        "description": "seeded by the load benchmark",
+                        "status": "IN_PROGRESS" if i % 3 else "COMPLETED",
+                        "deadline": now + timedelta(days=i % 60 - 10),
+                        "project_id": project_id,
+                        "created_by_id": members[0],
+                        "assignee_id": members[i % len(members)],
+                    }
+                    for i in range(plan.tasks_per_project)
+                ],
+            )
+    engine.dispose()
+
+
+def start_server(port: int, workers: int, database: str) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "main:app",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--no-access-log",
+    ]
+    # own process group so the hashing pool workers go down with the server
+    return subprocess.Popen(
+        command,
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "DB_NAME": database},
+        start_new_session=True,
+    )
+
+
+def stop_server(server: subprocess.Popen):
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def wait_until_ready(url: str, server: subprocess.Popen | None, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{url}/openapi.json").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.recording = False
+
+    async def request(self, client, label, method, url, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.samples[label].append((elapsed, response.status_code))
+        return response
+
+
+async def login(recorder, client, email):
+    response = await recorder.request(
+        client,
+        "POST /user/login/",
+        "POST",
+        "/user/login/",
+        data={"username": email, "password": PASSWORD},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def virtual_user(recorder, client, plan, weights, rng, spares, deadline):
+    user_id = rng.randint(1, plan.users)
+    headers = await login(recorder, client, user_email(user_id))
+    projects = plan.projects_of[user_id]
+    managed = [p for p in projects if plan.creators[p] == user_id]
+    names, cumulative = list(weights), list(itertools.accumulate(weights.values()))
+
+    while time.monotonic() < deadline:
+        operation = rng.choices(names, cum_weights=cumulative)[0]
+        if operation == "add_member" and not managed:
+            operation = "list_projects"
+        if operation in ("list_tasks", "update_task") and not projects:
+            operation = "list_projects"
+
+        if operation == "login":
+            headers = await login(recorder, client, user_email(user_id))
+        elif operation == "list_projects":
+            await recorder.request(
+                client,
+                "GET /project/my-projects/",
+                "GET",
+                "/project/my-projects/",
+                headers=headers,
+            )
+        elif operation == "list_tasks":
+            await recorder.request(
+                client,
+                "GET /project/{id}/task/",
+                "GET",
+                f"/project/{rng.choice(projects)}/task/",
+                params={"limit": 50},
+                headers=headers,
+            )
+        elif operation == "update_task":
+            project_id = rng.choice(projects)
+            task_id = rng.choice(plan.task_ids(project_id))
+            await recorder.request(
+                client,
+                "PUT /project/{id}/task/{task_id}",
+                "PUT",
+                f"/project/{project_id}/task/{task_id}",
+                json={"status": rng.choice(["IN_PROGRESS", "COMPLETED"])},
+                headers=headers,
+            )
+        elif operation == "add_member":
+            email = spare_email(next(spares) % max(plan.spare_users, 1))
+            await recorder.request(
+                client,
+                "PUT /project/{id}/add/user",
+                "PUT",
+                f"/project/{rng.choice(managed)}/add/user",
+                params={"email_to_add": email},
+                headers=headers,
+            )
+        else:
+            raise ValueError(f"unknown operation {operation!r}")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = max(0, round(fraction * len(sorted_values) + 0.5) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(samples, duration: float) -> dict:
+    latencies = sorted(elapsed for elapsed, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "throughput_rps": round(len(samples) / duration, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_workload(url, plan, args) -> dict:
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    spares = itertools.count()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        measured_from = started + args.warmup
+        deadline = measured_from + args.duration
+
+        async def arm():
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+
+        users = [
+            virtual_user(
+                recorder,
+                client,
+                plan,
+                weights,
+                random.Random(rng.random()),
+                spares,
+                deadline,
+            )
+            for _ in range(args.concurrency)
+        ]
+        await asyncio.gather(arm(), *users)
+        duration = time.monotonic() - measured_from
+
+    every_sample = [
+        sample for samples in recorder.samples.values() for sample in samples
+    ]
+    return {
+        "duration_s": round(duration, 2),
+        "total": summarize(every_sample, duration),
+        "routes": {
+            label: summarize(samples, duration)
+            for label, samples in sorted(recorder.samples.items())
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict):
+    header = f"{'route':36} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    rows = [*result["routes"].items(), ("total", result["total"])]
+    for label, stats in rows:
+        print(
+            f"{label:36} {stats['requests']:7} {stats['errors']:5} "
+            f"{stats['throughput_rps']:8} {stats['p50_ms']:8} "
+            f"{stats['p95_ms']:8} {stats['p99_ms']:8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url",
+        help="benchmark a running server instead, seeded earlier with the same "
+        "sizes and seed",
+    )
+    parser.add_argument(
+        "--database",
+        help="database to seed and serve from, emptied first, required unless "
+        "--url is given",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--spare-users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--members-per-project", type=int, default=10)
+    parser.add_argument("--tasks-per-project", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    if args.url is None:
+        if args.database is None:
+            parser.error("--database is required to seed a server")
+        if args.database == db_name:
+            parser.error(f"--database {args.database} is the app database DB_NAME")
+
+    plan = Plan(args)
+    started_at = datetime.now(timezone.utc)
+    server = None
+    url = args.url
+    if url is None:
+        database = database_url(args.database)
+        ensure_database(database)
+        seed(database, plan)
+        server = start_server(args.port, args.server_workers, args.database)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(url, server)
+        result = asyncio.run(run_workload(url, plan, args))
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    commit = git_commit()
+    result["meta"] = {
+        "commit": commit,
+        "started_at": started_at.isoformat(),
+        "use_async_db": USE_ASYNC_DB,
+        "args": {key: str(value) for key, value in vars(args).items()},
+    }
+    output = args.output
+    if output is None:
+        stamp = started_at.strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print_report(result)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Per-row cost of turning task rows into a JSON response body.
+
+Compares FastAPI's default path for ``response_model=list[TaskShow]``
+(validate, ``jsonable_encoder``, json module) with ``core.responses.render``
+(one read of the model fields, orjson), for ORM objects and for plain mappings.
+Needs the usual environment settings but no running database:
+
+    cd backend && python -m benchmarks.serialization --rows 1000
+"""
+
+import argparse
+import asyncio
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from models import Task, TaskStatus
+from schemas.task_schema import TaskShow
+from core.responses import render
+
+
+def make_tasks(count: int) -> list[Task]:
+    now = datetime.now(timezone.utc)
+    return [
+        Task(
+            id=i,
+            title=f"task {i}",
+            description="a task used to measure serialization " * 3,
+            status=TaskStatus.IN_PROGRESS if i % 2 else TaskStatus.COMPLETED,
+            date_of_creation=now,
+            updated_at=now,
+            deadline=now + timedelta(days=i % 30),
+            project_id=1,
+            created_by_id=1,
+            assignee_id=i % 7 or None,
+        )
+        for i in range(count)
+    ]
+
+
+def fastapi_default(tasks) -> bytes:
+    field = create_response_field(name="response", type_=list[TaskShow])
+    content = asyncio.run(serialize_response(field=field, response_content=tasks))
+    return JSONResponse(content).body
+
+
+def single_pass(tasks) -> bytes:
+    return render(list[TaskShow], tasks).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.rows)
+    columns = [column for column in Task.__table__.c if column.key != "search_vector"]
+    rows = [
+        {column.key: getattr(task, column.key) for column in columns} for task in tasks
+    ]
+    # both paths must produce the same document
+    assert json.loads(fastapi_default(tasks)) == json.loads(single_pass(tasks))
+
+    for label, content in (("ORM objects", tasks), ("mappings", rows)):
+        print(f"{label}, {args.rows} rows:")
+        for name, fn in (("fastapi default", fastapi_default), ("render", single_pass)):
+            best = min(timeit.repeat(lambda: fn(content), number=1, repeat=args.repeat))
+            print(f"  {name:16} {best * 1e6 / args.rows:8.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()
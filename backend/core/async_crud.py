@@ -0,0 +1,239 @@
+"""AsyncSession counterparts of core.crud.
+
+Every function runs the matching sync implementation through
+``AsyncSession.run_sync``, so the queries live in one place and the IO is
+done by the async driver without holding a threadpool worker.
+"""
+
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import User, Project, Task, Job
+from schemas.user_schema import UserCreate, UserShow
+from schemas.project_schema import ProjectCreate, ProjectRole
+from schemas.task_schema import TaskCreate, TaskUpdate, TaskFilter, TaskSort
+from core import crud, hashing
+
+
+def _load_members(projects: list[Project]):
+    # ProjectShow serializes users and managers after the handler returns, where
+    # lazy loading is no longer possible, so load them inside run_sync
+    for project in projects:
+        if project is not None:
+            project.users, project.managers
+
+
+def _with_members(crud_function):
+    def run(db, *args):
+        result = crud_function(db, *args)
+        _load_members(result if isinstance(result, list) else [result])
+        return result
+
+    return run
+
+
+# read
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    return await db.run_sync(crud.get_user_by_email, email)
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> User | None:
+    return await db.run_sync(crud.get_user_by_username, username)
+
+
+async def get_project_by_id(db: AsyncSession, project_id: int) -> Project | None:
+    return await db.run_sync(_with_members(crud.get_project_by_id), project_id)
+
+
+async def get_user_projects(db: AsyncSession, user: User) -> list[Project]:
+    return await db.run_sync(_with_members(crud.get_user_projects), user)
+
+
+async def get_project_tasks(
+    db: AsyncSession,
+    project_id: int,
+    filters: TaskFilter = TaskFilter(),
+    sort: TaskSort = TaskSort.ID,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list[Task], str | None]:
+    return await db.run_sync(
+        crud.get_project_tasks, project_id, filters, sort, limit, cursor
+    )
+
+
+async def get_task_changes(
+    db: AsyncSession,
+    project_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 200,
+) -> dict:
+    return await db.run_sync(crud.get_task_changes, project_id, since, cursor, limit)
+
+
+async def search_tasks(
+    db: AsyncSession,
+    text: str,
+    project_id: int | None = None,
+    user_id: int | None = None,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list[Task], str | None]:
+    return await db.run_sync(
+        crud.search_tasks, text, project_id, user_id, limit, cursor
+    )
+
+
+async def get_project_dashboard(
+    db: AsyncSession, project: Project, role: ProjectRole, limit: int = 50
+) -> dict:
+    def run(session):
+        _load_members([project])
+        return crud.get_project_dashboard(session, project, role, limit)
+
+    return await db.run_sync(run)
+
+
+async def get_project_stats(db: AsyncSession, project_id: int) -> dict:
+    return await db.run_sync(crud.get_project_stats, project_id)
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Job | None:
+    return await db.run_sync(crud.get_job, job_id)
+
+
+async def get_project_task(db: AsyncSession, project_id: int, task_id: int) -> Task:
+    return await db.run_sync(crud.get_project_task, project_id, task_id)
+
+
+async def is_project_owner(db: AsyncSession, user_id: int, project_id: int) -> bool:
+    return await db.run_sync(crud.is_project_owner, user_id, project_id)
+
+
+async def is_project_manager(db: AsyncSession, user_id: int, project_id: int) -> bool:
+    return await db.run_sync(crud.is_project_manager, user_id, project_id)
+
+
+async def is_project_member(db: AsyncSession, user_id: int, project_id: int) -> bool:
+    return await db.run_sync(crud.is_project_member, user_id, project_id)
+
+
+async def get_user_project_access(
+    db: AsyncSession,
+    username: str,
+    project_id: int,
+    with_project: bool = False,
+    user_id: int | None = None,
+) -> tuple[User, ProjectRole | None, Project | None] | None:
+    return await db.run_sync(
+        crud.get_user_project_access, username, project_id, with_project, user_id
+    )
+
+
+async def load_members(db: AsyncSession, project: Project) -> Project:
+    await db.run_sync(lambda _: _load_members([project]))
+    return project
+
+
+# create
+
+
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
+    hashed_password = await hashing.async_get_password_hash(user.password)
+    return await db.run_sync(crud.insert_user, user, hashed_password)
+
+
+async def create_project(
+    db: AsyncSession, user: UserShow, project: ProjectCreate
+) -> Project:
+    return await db.run_sync(_with_members(crud.create_project), user, project)
+
+
+async def create_task(
+    db: AsyncSession, project_id: int, task: TaskCreate, curr_user: UserShow
+) -> Task:
+    return await db.run_sync(crud.create_task, project_id, task, curr_user)
+
+
+async def create_tasks(
+    db: AsyncSession, project_id: int, tasks: list[TaskCreate], curr_user: UserShow
+) -> list:
+    return await db.run_sync(crud.create_tasks, project_id, tasks, curr_user)
+
+
+# update
+async def add_user_to_project(db: AsyncSession, user_to_add: User, project_id: int):
+    return await db.run_sync(
+        _with_members(crud.add_user_to_project), user_to_add, project_id
+    )
+
+
+async def add_manager_to_project(db: AsyncSession, user_to_add: User, project_id: int):
+    return await db.run_sync(
+        _with_members(crud.add_manager_to_project), user_to_add, project_id
+    )
+
+
+async def add_users_to_project(
+    db: AsyncSession, project_id: int, emails: list[str], manager: bool = False
+) -> dict:
+    return await db.run_sync(crud.add_users_to_project, project_id, emails, manager)
+
+
+async def update_password_hash(
+    db: AsyncSession, user: User, hashed_password: str
+) -> User:
+    return await db.run_sync(crud.update_password_hash, user, hashed_password)
+
+
+async def update_task(
+    db: AsyncSession, project_id: int, task_id: int, task_data: TaskUpdate
+) -> Task | None:
+    return await db.run_sync(crud.update_task, project_id, task_id, task_data)
+
+
+async def update_tasks(
+    db: AsyncSession,
+    project_id: int,
+    task_data: TaskUpdate,
+    task_ids: list[int] | None = None,
+    filters: TaskFilter | None = None,
+) -> list:
+    return await db.run_sync(
+        crud.update_tasks, project_id, task_data, task_ids, filters
+    )
+
+
+# delete
+
+
+async def remove_user_from_project(
+    db: AsyncSession, user_to_remove: User, project_id: int, removed_by: User
+) -> Job:
+    return await db.run_sync(
+        crud.remove_user_from_project, user_to_remove, project_id, removed_by
+    )
+
+
+async def remove_users_from_project(
+    db: AsyncSession,
+    project_id: int,
+    emails: list[str],
+    user_ids: list[int],
+    removed_by: User,
+) -> dict:
+    return await db.run_sync(
+        crud.remove_users_from_project, project_id, emails, user_ids, removed_by
+    )
+
+
+async def schedule_project_deletion(
+    db: AsyncSession, project_id: int, deleted_by: User
+) -> Job:
+    return await db.run_sync(crud.schedule_project_deletion, project_id, deleted_by)
+
+
+async def remove_task_from_project(
+    db: AsyncSession, Task_to_remove: Task, project_id: int
+):
+    return await db.run_sync(crud.remove_task_from_project, Task_to_remove, project_id)
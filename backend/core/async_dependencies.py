@@ -0,0 +1,57 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import EmailStr
+from core.hashing import async_verify_and_update
+from core.dependencies import (
+    oauth2_scheme,
+    credentials_exception,
+    decode_access_token,
+    check_project_access,
+    ProjectAccess,
+)
+from schemas.project_schema import ProjectRole
+from database import get_async_db
+from core import async_crud
+
+
+async def authenticate_user(db: AsyncSession, email: EmailStr, password: str):
+    user = await async_crud.get_user_by_email(db, email)
+    if not user:
+        return False
+    verified, new_hash = await async_verify_and_update(password, user.hashed_password)
+    if not verified:
+        return False
+    if new_hash is not None:
+        await async_crud.update_password_hash(db, user, new_hash)
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+):
+    token_data = decode_access_token(token)
+    user = await async_crud.get_user_by_username(db, username=token_data.username)
+    if user is None:
+        raise credentials_exception()
+    return user
+
+
+def require_project_role(required: ProjectRole, with_project: bool = False):
+    async def dependency(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db),
+        project_id: int = ...,
+    ) -> ProjectAccess:
+        token_data = decode_access_token(token)
+        access = await async_crud.get_user_project_access(
+            db, token_data.username, project_id, with_project, token_data.user_id
+        )
+        return check_project_access(access, required, with_project)
+
+    return dependency
+
+
+get_project_member = require_project_role(ProjectRole.MEMBER)
+get_project_manager = require_project_role(ProjectRole.MANAGER)
+get_project_owner = require_project_role(ProjectRole.OWNER)
+get_project_for_member = require_project_role(ProjectRole.MEMBER, with_project=True)
@@ -0,0 +1,38 @@
+from typing import TypeVar
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from schemas.bulk_schema import BulkItemError
+from core.config import BULK_MAX_ITEMS
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def check_batch_size(items: list):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"at most {BULK_MAX_ITEMS} items per request",
+        )
+
+
+def parse_items(
+    items: list, model: type[Model], partial: bool
+) -> tuple[list[Model], list[BulkItemError]]:
+    """Validate every item of a bulk request body.
+
+    Invalid items fail the whole request with a 422 listing all of them,
+    unless ``partial`` is set, then they are returned next to the valid ones.
+    """
+    check_batch_size(items)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(model.parse_obj(item))
+        except ValidationError as error:
+            errors.append(BulkItemError(index=index, errors=error.errors()))
+    if errors and not partial:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[error.dict() for error in errors],
+        )
+    return valid, errors
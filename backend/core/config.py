@@ -19,3 +19,63 @@ SQLALCHEMY_DATABASE_URL = (
 SQLALCHEMY_TEST_DATABASE_URL = (
     f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_test_name}"
 )
+SQLALCHEMY_ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+)
+SQLALCHEMY_ASYNC_TEST_DATABASE_URL = (
+    f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_test_name}"
+)
+
+# connection pool, applied per engine and so per uvicorn worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# per-process cache of project roles used by the authorization dependencies,
+# the TTL bounds how long other workers may act on a revoked role
+ROLE_CACHE_MAX_SIZE = int(os.getenv("ROLE_CACHE_MAX_SIZE", "10000"))
+ROLE_CACHE_TTL_SECONDS = float(os.getenv("ROLE_CACHE_TTL_SECONDS", "30"))
+
+# bcrypt runs in a process pool, requests beyond HASH_POOL_WORKERS +
+# HASH_QUEUE_LIMIT concurrent hashes get a 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+
+# deleted task ids are kept this long for the change feed, a sync resuming
+# from further back is told to start over
+TASK_TOMBSTONE_RETENTION_DAYS = float(os.getenv("TASK_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# upper bound on the number of items a bulk endpoint accepts per request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# serve the API from the AsyncSession stack (routers/async_*) instead of the sync one
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() == "true"
+
+# project event streams: idle streams get a comment this often so proxies keep
+# them open, a subscriber that falls this many events behind is told to resync
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# background jobs: every worker polls for jobs this often, a failed job is
+# retried after JOB_RETRY_DELAY_SECONDS, doubling each time, up to
+# JOB_MAX_ATTEMPTS runs, a running job not heard from for JOB_LEASE_SECONDS is
+# taken over, and bulk deletes and updates commit every JOB_CHUNK_SIZE rows
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_RETRY_DELAY_SECONDS = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "5"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "1000"))
+
+# operational endpoints (/internal/*, /metrics) answer only requests carrying
+# "Authorization: Bearer <INTERNAL_TOKEN>", and are off while it is unset
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN") or None
+
+# request timing middleware and the Prometheus /metrics endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# development aid, every response carries its query count and DB time in the
+# X-DB-Queries and Server-Timing headers
+QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "false").lower() == "true"
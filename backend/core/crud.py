@@ -1,10 +1,35 @@
+import json
+from datetime import datetime, timedelta
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from models import User, Project, project_managers, project_users, Task
+from sqlalchemy import or_, and_, case, delete, exists, func, select, insert, tuple_
+from sqlalchemy import Double, Integer, String, cast, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
+from models import User, Project, project_managers, project_users, Task, TaskTombstone
+from models import Job, JobStatus
+from models import TASK_SEARCH_CONFIG
 from schemas.user_schema import UserCreate, UserShow
-from schemas.project_schema import ProjectCreate
-from schemas.task_schema import TaskCreate, TaskUpdate
+from schemas.project_schema import ProjectCreate, ProjectRole, MemberOutcome
+from schemas.task_schema import TaskCreate, TaskUpdate, TaskFilter, TaskSort, TaskStatus
 from core import hashing
+from core.events import EVENTS_CHANNEL
+from core.pagination import encode_cursor, decode_cursor, invalid_cursor
+from core.role_cache import role_cache
+from core.config import BULK_MAX_ITEMS, TASK_TOMBSTONE_RETENTION_DAYS
+
+ROLE_RANK = {ProjectRole.MEMBER: 1, ProjectRole.MANAGER: 2, ProjectRole.OWNER: 3}
+
+# the columns bulk writes return, the search vector only matters to queries
+RETURNED_TASK_COLUMNS = [
+    column for column in Task.__table__.c if column.key != "search_vector"
+]
+
+# a write is stamped before its transaction commits, so it can become visible
+# after a sync already read past its updated_at, a finished sync resumes a bit
+# earlier to pick those up
+CHANGES_OVERLAP = timedelta(seconds=5)
+TOMBSTONE_RETENTION = timedelta(days=TASK_TOMBSTONE_RETENTION_DAYS)
 
 
 # read
@@ -20,8 +45,278 @@ def get_project_by_id(db: Session, project_id: int) -> Project | None:
     return db.query(Project).filter_by(id=project_id).first()
 
 
-def get_project_tasks(db: Session, project_id: int) -> list[Task] | None:
-    return get_project_by_id(db, project_id).tasks
+def get_user_projects(db: Session, user: User) -> list[Project]:
+    # members and managers of all projects come in two extra queries instead
+    # of two per project when ProjectShow serializes them
+    return (
+        db.query(Project)
+        .join(project_users, project_users.c.project_id == Project.id)
+        .filter(project_users.c.user_id == user.id)
+        .options(selectinload(Project.users), selectinload(Project.managers))
+        .order_by(Project.id)
+        .all()
+    )
+
+
+def _task_conditions(filters: TaskFilter) -> list:
+    conditions = []
+    if filters.status is not None:
+        conditions.append(Task.status == filters.status)
+    if filters.assignee_id is not None:
+        conditions.append(Task.assignee_id == filters.assignee_id)
+    if filters.created_by_id is not None:
+        conditions.append(Task.created_by_id == filters.created_by_id)
+    if filters.deadline_from is not None:
+        conditions.append(Task.deadline >= filters.deadline_from)
+    if filters.deadline_to is not None:
+        conditions.append(Task.deadline <= filters.deadline_to)
+    return conditions
+
+
+def _after_task(sort: TaskSort, cursor: str):
+    # keyset condition for "rows after the cursor" in the given sort order,
+    # tasks without a deadline always come last
+    position = decode_cursor(cursor)
+    try:
+        if position["sort"] != sort.value:
+            raise invalid_cursor()
+        last_id = int(position["id"])
+        deadline = position.get("deadline")
+        deadline = datetime.fromisoformat(deadline) if deadline else None
+    except (KeyError, TypeError, ValueError):
+        raise invalid_cursor()
+
+    descending = sort in (TaskSort.ID_DESC, TaskSort.DEADLINE_DESC)
+    after_id = Task.id < last_id if descending else Task.id > last_id
+    if sort in (TaskSort.ID, TaskSort.ID_DESC):
+        return after_id
+    if deadline is None:
+        return and_(Task.deadline.is_(None), after_id)
+    after_deadline = (
+        Task.deadline < deadline if descending else Task.deadline > deadline
+    )
+    return or_(
+        after_deadline,
+        and_(Task.deadline == deadline, after_id),
+        Task.deadline.is_(None),
+    )
+
+
+def get_project_tasks(
+    db: Session,
+    project_id: int,
+    filters: TaskFilter = TaskFilter(),
+    sort: TaskSort = TaskSort.ID,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list[Task], str | None]:
+    query = db.query(Task).filter(
+        Task.project_id == project_id, *_task_conditions(filters)
+    )
+    if cursor is not None:
+        query = query.filter(_after_task(sort, cursor))
+
+    descending = sort in (TaskSort.ID_DESC, TaskSort.DEADLINE_DESC)
+    order = [Task.id.desc() if descending else Task.id.asc()]
+    if sort in (TaskSort.DEADLINE, TaskSort.DEADLINE_DESC):
+        deadline = Task.deadline.desc() if descending else Task.deadline.asc()
+        order.insert(0, deadline.nulls_last())
+
+    # one extra row tells us whether there is a next page
+    tasks = query.order_by(*order).limit(limit + 1).all()
+    if len(tasks) <= limit:
+        return tasks, None
+    tasks = tasks[:limit]
+    last = tasks[-1]
+    next_cursor = encode_cursor(
+        {
+            "sort": sort.value,
+            "id": last.id,
+            "deadline": last.deadline.isoformat() if last.deadline else None,
+        }
+    )
+    return tasks, next_cursor
+
+
+def _changes_position(since: datetime | None, cursor: str | None):
+    if cursor is None:
+        return since, 0
+    position = decode_cursor(cursor)
+    try:
+        updated_at = datetime.fromisoformat(position["updated_at"])
+        if updated_at.tzinfo is None:
+            raise ValueError("naive timestamp")
+        return updated_at, int(position["id"])
+    except (KeyError, TypeError, ValueError):
+        raise invalid_cursor()
+
+
+def get_task_changes(
+    db: Session,
+    project_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 200,
+) -> dict:
+    """Tasks changed and task ids deleted from ``since`` (or the position in
+    ``cursor``) on, oldest change first, at most ``limit`` of both together.
+
+    Rows near the end of a finished sync may be sent again by the next one,
+    clients apply changes as upserts so that is harmless. Deletions are only
+    kept for TOMBSTONE_RETENTION, so a sync from further back is refused with
+    a 410, the client reloads the tasks and syncs from the time of the reload.
+    """
+    updated_at, last_id = _changes_position(since, cursor)
+    now = db.scalar(select(func.statement_timestamp()))
+    if updated_at < now - TOMBSTONE_RETENTION:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="deletions this old are no longer kept, reload the tasks and "
+            "sync from the time of the reload",
+        )
+    changed = (
+        db.query(Task)
+        .filter(
+            Task.project_id == project_id,
+            tuple_(Task.updated_at, Task.id) > tuple_(updated_at, last_id),
+        )
+        .order_by(Task.updated_at, Task.id)
+        .limit(limit + 1)
+        .all()
+    )
+    deleted = db.execute(
+        select(TaskTombstone.deleted_at, TaskTombstone.task_id)
+        .where(
+            TaskTombstone.project_id == project_id,
+            tuple_(TaskTombstone.deleted_at, TaskTombstone.task_id)
+            > tuple_(updated_at, last_id),
+        )
+        .order_by(TaskTombstone.deleted_at, TaskTombstone.task_id)
+        .limit(limit + 1)
+    ).all()
+
+    # both in one (time, id) order, the first limit of it can only come from
+    # the first limit + 1 of each
+    stream = sorted(
+        [((task.updated_at, task.id), task) for task in changed]
+        + [((deleted_at, task_id), None) for deleted_at, task_id in deleted],
+        key=lambda item: item[0],
+    )
+    has_more = len(stream) > limit
+    if has_more:
+        stream = stream[:limit]
+        position = stream[-1][0]
+    else:
+        position = max((now - CHANGES_OVERLAP, 0), (updated_at, last_id))
+    changed = [task for _, task in stream if task is not None]
+    deleted = [task_id for (_, task_id), task in stream if task is None]
+    next_cursor = encode_cursor(
+        {"updated_at": position[0].isoformat(), "id": position[1]}
+    )
+    return {
+        "changed": changed,
+        "deleted": deleted,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
+def search_tasks(
+    db: Session,
+    text: str,
+    project_id: int | None = None,
+    user_id: int | None = None,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list[Task], str | None]:
+    """Tasks matching a web-style search query, best match first.
+
+    Scoped to one project, or with ``user_id`` to every project the user is
+    a member of.
+    """
+    query = func.websearch_to_tsquery(TASK_SEARCH_CONFIG, text)
+    # float4 from Postgres, as a double the rank sent in the cursor compares
+    # equal to the one it came from, otherwise ties on the page end are skipped
+    rank = cast(func.ts_rank_cd(Task.search_vector, query), Double)
+    search = db.query(Task, rank).filter(Task.search_vector.op("@@")(query))
+    if project_id is not None:
+        search = search.filter(Task.project_id == project_id)
+    if user_id is not None:
+        search = search.join(
+            project_users, project_users.c.project_id == Task.project_id
+        ).filter(project_users.c.user_id == user_id)
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        try:
+            if position["q"] != text:
+                raise invalid_cursor()
+            last_rank, last_id = float(position["rank"]), int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise invalid_cursor()
+        search = search.filter(
+            or_(rank < last_rank, and_(rank == last_rank, Task.id < last_id))
+        )
+
+    rows = search.order_by(rank.desc(), Task.id.desc()).limit(limit + 1).all()
+    tasks = [task for task, _ in rows[:limit]]
+    if len(rows) <= limit:
+        return tasks, None
+    last_task, last_rank = rows[limit - 1]
+    next_cursor = encode_cursor({"q": text, "rank": last_rank, "id": last_task.id})
+    return tasks, next_cursor
+
+
+def get_project_dashboard(
+    db: Session, project: Project, role: ProjectRole, limit: int = 50
+) -> dict:
+    """The project view in one response, one task query per status."""
+    tasks = {}
+    for task_status in TaskStatus:
+        items, next_cursor = get_project_tasks(
+            db, project.id, TaskFilter(status=task_status), TaskSort.ID, limit
+        )
+        tasks[task_status] = {"items": items, "next_cursor": next_cursor}
+    return {"project": project, "role": role, "tasks": tasks}
+
+
+def get_project_stats(db: Session, project_id: int) -> dict:
+    """Task counts by status, overdue and per assignee from one GROUP BY."""
+    overdue = and_(
+        Task.status.is_distinct_from(TaskStatus.COMPLETED), Task.deadline < func.now()
+    )
+    rows = db.execute(
+        select(
+            Task.assignee_id,
+            Task.status,
+            func.count().label("count"),
+            func.count().filter(overdue).label("overdue"),
+        )
+        .where(Task.project_id == project_id)
+        .group_by(Task.assignee_id, Task.status)
+    ).all()
+
+    by_status = {task_status: 0 for task_status in TaskStatus}
+    workload = {}
+    for row in rows:
+        # tasks created with a null status are in progress
+        task_status = TaskStatus(row.status or TaskStatus.IN_PROGRESS)
+        by_status[task_status] += row.count
+        assignee = workload.setdefault(
+            row.assignee_id, {"assignee_id": row.assignee_id, "overdue": 0}
+        )
+        key = "completed" if task_status == TaskStatus.COMPLETED else "in_progress"
+        assignee[key] = assignee.get(key, 0) + row.count
+        assignee["overdue"] += row.overdue
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "overdue": sum(row.overdue for row in rows),
+        "workload": list(workload.values()),
+    }
+
+
+def get_job(db: Session, job_id: int) -> Job | None:
+    return db.get(Job, job_id)
 
 
 def get_project_task(db: Session, project_id: int, task_id: int) -> Task:
@@ -55,11 +350,126 @@ def is_project_member(db: Session, user_id: int, project_id: int) -> bool:
     )
 
 
+def _role_columns(user_id, project_id: int) -> list:
+    # user_id may be a column, so the same columns work in a join on users
+    return [
+        Project.creator_id,
+        exists().where(
+            project_managers.c.user_id == user_id,
+            project_managers.c.project_id == project_id,
+        ),
+        exists().where(
+            project_users.c.user_id == user_id,
+            project_users.c.project_id == project_id,
+        ),
+    ]
+
+
+def _role(user_id: int, creator_id: int | None, manager: bool, member: bool):
+    if creator_id is not None and creator_id == user_id:
+        return ProjectRole.OWNER
+    if manager:
+        return ProjectRole.MANAGER
+    if member:
+        return ProjectRole.MEMBER
+    return None
+
+
+def get_user_project_access(
+    db: Session,
+    username: str,
+    project_id: int,
+    with_project: bool = False,
+    user_id: int | None = None,
+) -> tuple[User, ProjectRole | None, Project | None] | None:
+    """Load a user, their role in a project and optionally the project itself
+    with a single statement.
+
+    When the caller's id is known and their role is cached, the role
+    subqueries are left out of the statement.
+    """
+    role = role_cache.get(user_id, project_id) if user_id is not None else None
+    columns = [User]
+    if role is None:
+        columns += _role_columns(User.id, project_id)
+    if with_project:
+        columns.append(Project)
+    query = select(*columns)
+    if role is None or with_project:
+        query = query.outerjoin(Project, Project.id == project_id)
+    row = db.execute(query.where(User.username == username)).first()
+    if row is None:
+        return None
+    user, *row = row
+    if role is None:
+        role = _role(user.id, *row[:3])
+        row = row[3:]
+        # non-members aren't cached, so a user added on another worker gets
+        # in right away
+        if role is not None:
+            role_cache.set(user.id, project_id, role)
+    return user, role, row[0] if with_project else None
+
+
+def has_role(role: ProjectRole | None, required: ProjectRole) -> bool:
+    return role is not None and ROLE_RANK[role] >= ROLE_RANK[required]
+
+
 # create
 
 
+def touch_project(db: Session, project_id: int):
+    # every write that changes what a project, task list or task read returns
+    # bumps the version their ETags are derived from
+    db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(version=Project.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def publish_event(db: Session, project_id: int, event_type: str, **data):
+    # NOTIFY is transactional, listeners only see the event once the write
+    # commits and never see it if the write rolls back
+    payload = json.dumps({"project_id": project_id, "type": event_type, **data})
+    db.execute(select(func.pg_notify(EVENTS_CHANNEL, payload)))
+
+
+def publish_member_events(
+    db: Session, project_id: int, event_type: str, user_ids: list[int]
+):
+    # an event per user from a single statement, the payloads match
+    # publish_event's
+    user_id = (
+        func.unnest(array(user_ids, type_=Integer))
+        .table_valued("user_id")
+        .render_derived()
+    )
+    payload = func.json_build_object(
+        "project_id", project_id, "type", event_type, "user_id", user_id.c.user_id
+    )
+    db.execute(
+        select(func.pg_notify(EVENTS_CHANNEL, payload.cast(String))).select_from(
+            user_id
+        )
+    )
+
+
+def add_job(db: Session, kind: str, created_by: User, **payload) -> Job:
+    # not committed, the job becomes visible to the runners together with the
+    # write that asked for it
+    job = Job(kind=kind, payload=payload, created_by_id=created_by.id)
+    db.add(job)
+    return job
+
+
 def create_user(db: Session, user: UserCreate) -> User:
     hashed_password = hashing.get_password_hash(user.password)
+    return insert_user(db, user, hashed_password)
+
+
+def insert_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     new_user = User(
         email=user.email, username=user.username, hashed_password=hashed_password
     )
@@ -86,16 +496,48 @@ def create_task(
 ) -> Task:
     new_task = Task(**task.dict(), project_id=project_id, created_by_id=curr_user.id)
     db.add(new_task)
+    db.flush()
+    touch_project(db, project_id)
+    publish_event(db, project_id, "task.created", task_id=new_task.id)
     db.commit()
     db.refresh(new_task)
     return new_task
 
 
+def create_tasks(
+    db: Session, project_id: int, tasks: list[TaskCreate], curr_user: UserShow
+) -> list:
+    """Insert all tasks with one multi-row INSERT ... RETURNING.
+
+    Returns the inserted rows rather than ORM objects, those would be expired
+    by the commit and reloaded one SELECT at a time.
+    """
+    if not tasks:
+        return []
+    rows = [
+        {**task.dict(), "project_id": project_id, "created_by_id": curr_user.id}
+        for task in tasks
+    ]
+    table = Task.__table__
+    new_tasks = db.execute(
+        insert(table).returning(*RETURNED_TASK_COLUMNS, sort_by_parameter_order=True),
+        rows,
+    ).all()
+    touch_project(db, project_id)
+    # one event per batch, a list of ids could outgrow the NOTIFY payload limit
+    publish_event(db, project_id, "tasks.created", count=len(new_tasks))
+    db.commit()
+    return new_tasks
+
+
 # update
 def add_user_to_project(db: Session, user_to_add: User, project_id: int):
     project = get_project_by_id(db, project_id)
     project.users.append(user_to_add)
+    touch_project(db, project_id)
+    publish_event(db, project_id, "member.added", user_id=user_to_add.id)
     db.commit()
+    role_cache.invalidate(user_to_add.id, project_id)
     db.refresh(project)
     return project
 
@@ -105,11 +547,73 @@ def add_manager_to_project(db: Session, user_to_add: User, project_id: int):
     if user_to_add not in project.users:
         project.users.append(user_to_add)
     project.managers.append(user_to_add)
+    touch_project(db, project_id)
+    publish_event(db, project_id, "manager.added", user_id=user_to_add.id)
     db.commit()
+    role_cache.invalidate(user_to_add.id, project_id)
     db.refresh(project)
     return project
 
 
+def add_users_to_project(
+    db: Session, project_id: int, emails: list[str], manager: bool = False
+) -> dict:
+    """Add the users with these emails to the project, as managers when
+    ``manager`` is set, with one INSERT per association table.
+
+    Existing memberships are left alone and reported in the results.
+    """
+    users = db.execute(select(User.id, User.email).where(User.email.in_(emails)))
+    id_of = {user.email: user.id for user in users}
+    # sorted, so concurrent requests lock the rows in the same order
+    rows = [
+        {"user_id": user_id, "project_id": project_id}
+        for user_id in sorted(set(id_of.values()))
+    ]
+
+    def insert_rows(table) -> set[int]:
+        if not rows:
+            return set()
+        inserted = db.execute(
+            pg_insert(table)
+            .values(rows)
+            .on_conflict_do_nothing()
+            .returning(table.c.user_id)
+        )
+        return set(inserted.scalars())
+
+    added_members = insert_rows(project_users)
+    added_managers = insert_rows(project_managers) if manager else set()
+    added = added_managers if manager else added_members
+    if added:
+        touch_project(db, project_id)
+        event_type = "manager.added" if manager else "member.added"
+        publish_member_events(db, project_id, event_type, sorted(added))
+    db.commit()
+    for user_id in added_members | added_managers:
+        role_cache.invalidate(user_id, project_id)
+
+    def result(email: str) -> dict:
+        user_id = id_of.get(email)
+        if user_id is None:
+            outcome = MemberOutcome.NOT_FOUND
+        elif user_id in added:
+            outcome = MemberOutcome.ADDED
+        elif manager:
+            outcome = MemberOutcome.ALREADY_MANAGER
+        else:
+            outcome = MemberOutcome.ALREADY_MEMBER
+        return {"email": email, "user_id": user_id, "outcome": outcome}
+
+    return {"results": [result(email) for email in emails]}
+
+
+def update_password_hash(db: Session, user: User, hashed_password: str) -> User:
+    user.hashed_password = hashed_password
+    db.commit()
+    return user
+
+
 def update_task(
     db: Session, project_id: int, task_id: int, task_data: TaskUpdate
 ) -> Task | None:
@@ -119,17 +623,112 @@ def update_task(
 
     for key, value in task_data.dict(exclude_unset=True).items():
         setattr(task, key, value)
+    touch_project(db, project_id)
+    publish_event(db, project_id, "task.updated", task_id=task_id)
     db.commit()
     db.refresh(task)
     return task
 
 
+def update_tasks(
+    db: Session,
+    project_id: int,
+    task_data: TaskUpdate,
+    task_ids: list[int] | None = None,
+    filters: TaskFilter | None = None,
+) -> list:
+    """Apply one TaskUpdate to the selected tasks with a single UPDATE ...
+    RETURNING, the selection is the intersection of ``task_ids`` and
+    ``filters``.
+
+    A selection by filter alone may match at most BULK_MAX_ITEMS tasks, more
+    fail the request with a 413 before anything is written.
+    """
+    conditions = [Task.project_id == project_id]
+    if task_ids is not None:
+        conditions.append(Task.id.in_(task_ids))
+    if filters is not None:
+        conditions += _task_conditions(filters)
+    if task_ids is None:
+        # locked, so the selection can't grow between the count and the write
+        matched = (
+            db.execute(
+                select(Task.id)
+                .where(*conditions)
+                .limit(BULK_MAX_ITEMS + 1)
+                .with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        if len(matched) > BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"the filter matches more than {BULK_MAX_ITEMS} tasks",
+            )
+        conditions.append(Task.id.in_(matched))
+    table = Task.__table__
+    updated_tasks = db.execute(
+        update(table)
+        .where(*conditions)
+        .values(task_data.dict(exclude_unset=True))
+        .returning(*RETURNED_TASK_COLUMNS)
+    ).all()
+    if updated_tasks:
+        touch_project(db, project_id)
+        publish_event(db, project_id, "tasks.updated", count=len(updated_tasks))
+    db.commit()
+    return updated_tasks
+
+
 # delete
 
 
+def _remove_members(
+    db: Session, project_id: int, user_ids: list[int], removed_by: User
+) -> tuple[list[int], Job | None]:
+    """Revoke the memberships with one DELETE per association table and queue
+    a job clearing the removed users from the project's tasks.
+
+    Not committed, returns the ids that were members and the job.
+    """
+    db.execute(
+        delete(project_managers).where(
+            project_managers.c.project_id == project_id,
+            project_managers.c.user_id.in_(user_ids),
+        )
+    )
+    removed = (
+        db.execute(
+            delete(project_users)
+            .where(
+                project_users.c.project_id == project_id,
+                project_users.c.user_id.in_(user_ids),
+            )
+            .returning(project_users.c.user_id)
+        )
+        .scalars()
+        .all()
+    )
+    if not removed:
+        return removed, None
+    touch_project(db, project_id)
+    publish_member_events(db, project_id, "member.removed", removed)
+    job = add_job(
+        db,
+        "project.unassign_users",
+        removed_by,
+        project_id=project_id,
+        user_ids=removed,
+    )
+    return removed, job
+
+
 def remove_user_from_project(
-    db: Session, user_to_remove: User, project_id: int
-) -> Project:
+    db: Session, user_to_remove: User, project_id: int, removed_by: User
+) -> Job:
+    """Revoke the membership right away and leave clearing the user from the
+    project's tasks to a background job."""
     project = get_project_by_id(db, project_id)
     if user_to_remove.id == project.creator_id:
         raise HTTPException(
@@ -137,30 +736,145 @@ def remove_user_from_project(
             detail="can't remove project owner",
         )
 
-    project.users.remove(user_to_remove)
-    if user_to_remove in project.managers:
-        project.managers.remove(user_to_remove)
+    _, job = _remove_members(db, project_id, [user_to_remove.id], removed_by)
+    db.commit()
+    role_cache.invalidate(user_to_remove.id, project_id)
+    return job
+
+
+def remove_users_from_project(
+    db: Session,
+    project_id: int,
+    emails: list[str],
+    user_ids: list[int],
+    removed_by: User,
+) -> dict:
+    """Remove the users given by email or id in one transaction, the owner and
+    unknown users are skipped and reported in the results."""
+    users = db.execute(
+        select(User.id, User.email).where(
+            or_(User.email.in_(emails), User.id.in_(user_ids))
+        )
+    ).all()
+    id_of = {user.email: user.id for user in users}
+    email_of = {user.id: user.email for user in users}
+    creator_id = db.query(Project.creator_id).filter_by(id=project_id).scalar()
+    candidates = [user_id for user_id in email_of if user_id != creator_id]
+    removed, job = _remove_members(db, project_id, candidates, removed_by)
+    db.commit()
+    for user_id in removed:
+        role_cache.invalidate(user_id, project_id)
+
+    removed = set(removed)
+
+    def result(email: str | None, user_id: int | None) -> dict:
+        if user_id is None or user_id not in email_of:
+            outcome = MemberOutcome.NOT_FOUND
+        elif user_id == creator_id:
+            outcome = MemberOutcome.OWNER
+        elif user_id in removed:
+            outcome = MemberOutcome.REMOVED
+        else:
+            outcome = MemberOutcome.NOT_MEMBER
+        return {"email": email, "user_id": user_id, "outcome": outcome}
+
+    results = [result(email, id_of.get(email)) for email in emails]
+    results += [result(email_of.get(user_id), user_id) for user_id in user_ids]
+    return {"results": results, "job": job}
+
+
+def unassign_users_tasks(
+    db: Session, project_id: int, user_ids: list[int], limit: int
+) -> int:
+    """Clear the users as creators and assignees of up to ``limit`` tasks of
+    the project, returns how many tasks changed."""
+    # users added back since keep their tasks
+    rejoined = select(project_users.c.user_id).where(
+        project_users.c.project_id == project_id,
+        project_users.c.user_id.in_(user_ids),
+    )
+    user_ids = set(user_ids) - set(db.execute(rejoined).scalars())
+    if not user_ids:
+        return 0
+    chunk = (
+        select(Task.id)
+        .where(
+            Task.project_id == project_id,
+            or_(Task.created_by_id.in_(user_ids), Task.assignee_id.in_(user_ids)),
+        )
+        .limit(limit)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(Task.__table__)
+        .where(Task.id.in_(chunk))
+        .values(
+            created_by_id=case(
+                (Task.created_by_id.in_(user_ids), None), else_=Task.created_by_id
+            ),
+            assignee_id=case(
+                (Task.assignee_id.in_(user_ids), None), else_=Task.assignee_id
+            ),
+        )
+    )
+    if result.rowcount:
+        touch_project(db, project_id)
+        publish_event(db, project_id, "tasks.updated", count=result.rowcount)
+    db.commit()
+    return result.rowcount
 
-    db.query(Task).filter_by(
-        project_id=project_id, created_by_id=user_to_remove.id
-    ).update({Task.created_by_id: None}, synchronize_session="fetch")
-    db.query(Task).filter_by(
-        project_id=project_id, assignee_id=user_to_remove.id
-    ).update({Task.assignee_id: None}, synchronize_session="fetch")
 
+def schedule_project_deletion(db: Session, project_id: int, deleted_by: User) -> Job:
+    # asking again while the deletion is pending returns the pending job
+    job = (
+        db.query(Job)
+        .filter(
+            Job.kind == "project.delete",
+            Job.payload["project_id"].as_integer() == project_id,
+            Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING)),
+        )
+        .first()
+    )
+    if job is None:
+        job = add_job(db, "project.delete", deleted_by, project_id=project_id)
+        db.commit()
+    return job
+
+
+def delete_project_tasks(db: Session, project_id: int, limit: int) -> int:
+    """Delete up to ``limit`` tasks of the project, returns how many went."""
+    chunk = (
+        select(Task.id).where(Task.project_id == project_id).limit(limit)
+    ).scalar_subquery()
+    result = db.execute(delete(Task.__table__).where(Task.id.in_(chunk)))
     db.commit()
-    db.refresh(project)
-    return project
+    return result.rowcount
 
 
 def delete_project(db: Session, project_id: int):
+    # the tasks are expected to be gone already, deleting them in one
+    # cascade would lock all of them for the whole transaction
     project = get_project_by_id(db, project_id)
+    if project is None:
+        return
     db.delete(project)
+    publish_event(db, project_id, "project.deleted")
     db.commit()
-    return {"message": "Project deleted successfully."}
+    role_cache.invalidate_project(project_id)
 
 
 def remove_task_from_project(db: Session, Task_to_remove: Task, project_id: int):
+    # every delete prunes the project's expired tombstones, so they never
+    # outnumber the deletes of the retention window
+    db.execute(
+        delete(TaskTombstone).where(
+            TaskTombstone.project_id == project_id,
+            TaskTombstone.deleted_at < func.statement_timestamp() - TOMBSTONE_RETENTION,
+        )
+    )
+    db.add(TaskTombstone(task_id=Task_to_remove.id, project_id=project_id))
     db.delete(Task_to_remove)
+    touch_project(db, project_id)
+    publish_event(db, project_id, "task.deleted", task_id=Task_to_remove.id)
     db.commit()
     return {"message": "Task removed from project successfully."}
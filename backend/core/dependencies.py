@@ -2,11 +2,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from pydantic import EmailStr
-from core.hashing import verify_password
+from core.hashing import verify_and_update
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from schemas.token_schema import TokenData
-from models import User
+from typing import NamedTuple
+from models import User, Project
+from schemas.project_schema import ProjectRole
 from database import get_db
 from core import crud
 from core.config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
@@ -19,8 +21,11 @@ def authenticate_user(db: Session, email: EmailStr, password: str):
     user = crud.get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        crud.update_password_hash(db, user, new_hash)
     return user
 
 
@@ -32,58 +37,76 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
+
+
+def decode_access_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
+            raise credentials_exception()
+        return TokenData(username=username, user_id=payload.get("uid"))
     except JWTError:
-        raise credentials_exception
+        raise credentials_exception()
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+):
+    token_data = decode_access_token(token)
     user = crud.get_user_by_username(db, username=token_data.username)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 
-def get_current_user_member(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    project_id: int = ...,
-):
-    if not crud.is_project_member(db, current_user.id, project_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
-        )
-    return current_user
+class ProjectAccess(NamedTuple):
+    user: User
+    role: ProjectRole
+    project: Project | None = None
 
 
-def get_current_user_manager(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    project_id: int = ...,
+def check_project_access(
+    access: tuple | None, required: ProjectRole, with_project: bool = False
 ):
-    if not crud.is_project_manager(db, current_user.id, project_id):
+    if access is None:
+        raise credentials_exception()
+    user, role, project = access
+    if not crud.has_role(role, required):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
         )
-    return current_user
+    if with_project and project is None:
+        # a cached role can outlive the project, deleted by another worker
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+        )
+    return ProjectAccess(user, role, project)
 
 
-def get_current_user_owner(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    project_id: int = ...,
-):
-    if not crud.is_project_owner(db, current_user.id, project_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
+def require_project_role(required: ProjectRole, with_project: bool = False):
+    # the caller, their role in the project and optionally the project row
+    # come from one query instead of one per check
+    def dependency(
+        token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_db),
+        project_id: int = ...,
+    ) -> ProjectAccess:
+        token_data = decode_access_token(token)
+        access = crud.get_user_project_access(
+            db, token_data.username, project_id, with_project, token_data.user_id
         )
-    return current_user
+        return check_project_access(access, required, with_project)
+
+    return dependency
+
+
+get_project_member = require_project_role(ProjectRole.MEMBER)
+get_project_manager = require_project_role(ProjectRole.MANAGER)
+get_project_owner = require_project_role(ProjectRole.OWNER)
+get_project_for_member = require_project_role(ProjectRole.MEMBER, with_project=True)
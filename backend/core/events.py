@@ -0,0 +1,111 @@
+"""Project change events, pushed to clients as Server-Sent Events.
+
+crud writes publish events with ``pg_notify`` inside their transaction, so
+Postgres delivers them on commit, and only then, to every uvicorn worker.
+Each worker holds one LISTEN connection and fans the events out to the
+streams subscribed to the project.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import asyncpg
+from core.config import (
+    SQLALCHEMY_DATABASE_URL,
+    EVENTS_HEARTBEAT_SECONDS,
+    EVENTS_QUEUE_SIZE,
+)
+
+EVENTS_CHANNEL = "project_events"
+
+# sent in place of the events a subscriber missed, clients refetch what they show
+RESYNC = {"type": "resync"}
+# sent when the LISTEN connection is lost, ends the stream so the client
+# reconnects and resubscribes through a new connection
+RECONNECT = {"type": "reconnect"}
+
+
+class EventBroker:
+    def __init__(self, dsn: str, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._connection = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            connection = await asyncpg.connect(self.dsn)
+            connection.add_termination_listener(self._on_termination)
+            await connection.add_listener(EVENTS_CHANNEL, self._on_notify)
+            self._connection = connection
+
+    async def stop(self):
+        async with self._lock:
+            if self._connection is not None:
+                await self._connection.close()
+                self._connection = None
+
+    @asynccontextmanager
+    async def subscribe(self, project_id: int):
+        # the LISTEN connection is opened by the first stream of the worker
+        await self.start()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[project_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[project_id].discard(queue)
+            if not self._subscribers[project_id]:
+                del self._subscribers[project_id]
+
+    def publish(self, event: dict):
+        for queue in self._subscribers.get(event.get("project_id"), ()):
+            self._put(queue, event)
+
+    def _put(self, queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(event if event is RECONNECT else RESYNC)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.publish(json.loads(payload))
+
+    def _on_termination(self, connection):
+        self._connection = None
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._put(queue, RECONNECT)
+
+
+broker = EventBroker(SQLALCHEMY_DATABASE_URL)
+
+
+def _ends_stream(event: dict, user_id: int) -> bool:
+    if event["type"] in ("project.deleted", RECONNECT["type"]):
+        return True
+    return event["type"] == "member.removed" and event.get("user_id") == user_id
+
+
+async def stream(project_id: int, user_id: int, broker: EventBroker = broker):
+    """SSE body for a project, ends when the project is deleted or the user
+    is removed from it."""
+    async with broker.subscribe(project_id) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if _ends_stream(event, user_id):
+                return
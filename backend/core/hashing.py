@@ -1,12 +1,103 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from core.config import BCRYPT_ROUNDS, HASH_POOL_WORKERS, HASH_QUEUE_LIMIT
 
+# pinning min and max to the configured cost makes needs_update flag every hash
+# made with another cost, so changing BCRYPT_ROUNDS rehashes passwords on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class HashingPool:
+    """Runs bcrypt in worker processes so it doesn't hold up request threads.
+
+    At most ``workers + queue_limit`` hashes are in flight, beyond that
+    requests are turned away with a 503 instead of queueing behind a burst.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # created on first use, so importing the app starts no processes, and
+        # from a forkserver: forking the threaded server would hand the workers
+        # its listening socket, signal handlers and whatever locks were held
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password operations, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hashing_pool = HashingPool(HASH_POOL_WORKERS, HASH_QUEUE_LIMIT)
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update(plain_password, hashed_password)[0]
+
+
+def verify_and_update(plain_password, hashed_password) -> tuple[bool, str | None]:
+    """Verify a password, the second item is a new hash when the stored one
+    was made with a different cost."""
+    return hashing_pool.submit(
+        _verify_and_update, plain_password, hashed_password
+    ).result()
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hashing_pool.submit(_hash, password).result()
+
+
+async def async_verify_and_update(
+    plain_password, hashed_password
+) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(
+        hashing_pool.submit(_verify_and_update, plain_password, hashed_password)
+    )
+
+
+async def async_get_password_hash(password):
+    return await asyncio.wrap_future(hashing_pool.submit(_hash, password))
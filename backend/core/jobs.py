@@ -0,0 +1,240 @@
+"""Background jobs for writes too heavy to run inside a request.
+
+Endpoints add a row to the jobs table in the transaction of the request and
+answer 202 with the job, whose progress is then read from /job/{id}. Every
+uvicorn worker runs a JobRunner thread that claims queued jobs with
+``FOR UPDATE SKIP LOCKED``, so a job runs on one worker at a time and the
+workers share the queue without further coordination.
+
+A handler is a generator that commits its work in chunks and yields after
+each one, so no transaction holds its locks for long and the runner can
+renew the job's lease in between. A failed job is retried from the start
+after a growing delay, handlers must make a repeated run harmless.
+"""
+
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from datetime import timedelta
+from sqlalchemy import and_, func, or_, select, update
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Job, JobStatus
+from schemas.job_schema import JobShow
+from core import crud
+from core.responses import render
+from core.config import (
+    JOB_POLL_SECONDS,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_LEASE_SECONDS,
+    JOB_CHUNK_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: dict[str, Callable[..., Iterator[None]]] = {}
+
+
+def handler(kind: str):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+
+    return register
+
+
+@handler("project.delete")
+def delete_project(db: Session, project_id: int):
+    while crud.delete_project_tasks(db, project_id, JOB_CHUNK_SIZE):
+        yield
+    crud.delete_project(db, project_id)
+
+
+@handler("project.unassign_users")
+def unassign_users(db: Session, project_id: int, user_ids: list[int]):
+    while crud.unassign_users_tasks(db, project_id, user_ids, JOB_CHUNK_SIZE):
+        yield
+
+
+class JobRunner:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        poll_seconds: float = JOB_POLL_SECONDS,
+        retry_delay: float = JOB_RETRY_DELAY_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="job-runner", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    def wake(self):
+        """Look for jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                with self.session_factory() as db:
+                    ran = self.run_pending(db)
+            except Exception:
+                logger.exception("job runner failed, polling again")
+                ran = 0
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_pending(self, db: Session) -> int:
+        """Run jobs until none is due, returns how many ran."""
+        self.fail_abandoned(db)
+        ran = 0
+        while not self._stopping.is_set():
+            job = self.claim(db)
+            if job is None:
+                break
+            self.run(db, job)
+            ran += 1
+        return ran
+
+    def _abandoned(self, now):
+        # the worker running it stopped renewing the lease, it died
+        return and_(
+            Job.status == JobStatus.RUNNING,
+            Job.locked_at < now - timedelta(seconds=self.lease_seconds),
+        )
+
+    def fail_abandoned(self, db: Session):
+        """Give up on abandoned jobs that used all their attempts, a job that
+        keeps taking its worker down would otherwise be taken over forever."""
+        now = func.statement_timestamp()
+        self._update_where(
+            db,
+            and_(self._abandoned(now), Job.attempts >= self.max_attempts),
+            status=JobStatus.FAILED,
+            error="the worker running it stopped",
+            finished_at=now,
+        )
+
+    def claim(self, db: Session) -> Job | None:
+        now = func.statement_timestamp()
+        due = or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_after <= now),
+            and_(self._abandoned(now), Job.attempts < self.max_attempts),
+        )
+        next_job = (
+            select(Job.id)
+            .where(due)
+            .order_by(Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        job = db.execute(
+            update(Job)
+            .where(Job.id == next_job)
+            .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1, locked_at=now)
+            .returning(Job)
+        ).scalar_one_or_none()
+        db.commit()
+        return job
+
+    def run(self, db: Session, job: Job):
+        job_id, kind, attempts = job.id, job.kind, job.attempts
+        try:
+            for _ in HANDLERS[kind](db, **job.payload):
+                if self._stopping.is_set():
+                    # shutting down, hand the job to another worker
+                    self._update(
+                        db,
+                        job_id,
+                        status=JobStatus.QUEUED,
+                        attempts=attempts - 1,
+                        locked_at=None,
+                    )
+                    return
+                self._update(db, job_id, locked_at=func.statement_timestamp())
+        except Exception as exception:
+            db.rollback()
+            logger.exception("job %s (%s) failed", job_id, kind)
+            # shown to the client, so only the exception class, its message
+            # can carry SQL and parameters and goes to the log with the traceback
+            error = type(exception).__name__
+            if attempts >= self.max_attempts:
+                self._update(
+                    db,
+                    job_id,
+                    status=JobStatus.FAILED,
+                    error=error,
+                    finished_at=func.statement_timestamp(),
+                )
+            else:
+                delay = timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+                self._update(
+                    db,
+                    job_id,
+                    status=JobStatus.QUEUED,
+                    error=error,
+                    run_after=func.statement_timestamp() + delay,
+                )
+            return
+        self._update(
+            db,
+            job_id,
+            status=JobStatus.SUCCEEDED,
+            error=None,
+            finished_at=func.statement_timestamp(),
+        )
+
+    def _update(self, db: Session, job_id: int, **values):
+        self._update_where(db, Job.id == job_id, **values)
+
+    def _update_where(self, db: Session, condition, **values):
+        db.execute(
+            update(Job)
+            .where(condition)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+runner = JobRunner(SessionLocal)
+
+
+def accepted(job: Job, model=JobShow, content=None) -> ORJSONResponse:
+    """202 response for a job the request queued, pointing at its status.
+
+    The body is the job unless ``content`` is given, rendered as ``model``.
+    """
+    runner.wake()
+    return render(
+        model,
+        job if content is None else content,
+        status_code=202,
+        headers={"Location": f"/job/{job.id}"},
+    )
@@ -0,0 +1,246 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Route
+
+# seconds, the upper bounds of the latency histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class QueryStats:
+    """Queries run and time spent in the database by one request."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# sync endpoints run on a copy of the request context in the threadpool, so the
+# stats object is shared by reference and mutated rather than reassigned
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def tracking_queries():
+    """Count the queries run in this context, joining an enclosing count."""
+    stats = _query_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _query_stats.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "total", "db_queries", "db_seconds")
+
+    def __init__(self, size: int):
+        # per bucket, made cumulative when rendered
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+class Metrics:
+    """Per-process request metrics in the Prometheus text format.
+
+    Each uvicorn worker keeps its own counters, a scrape sees the worker that
+    served it, so run the scraper against every worker or a single one.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.in_flight = 0
+        self._series: dict[tuple[str, str, int], _Series] = {}
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        queries: QueryStats,
+    ):
+        key = (method, route, status)
+        with self._lock:
+            self.in_flight -= 1
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets) + 1)
+            series.buckets[bisect_left(self.buckets, duration)] += 1
+            series.count += 1
+            series.total += duration
+            series.db_queries += queries.count
+            series.db_seconds += queries.duration
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            in_flight = self.in_flight
+            series = [
+                (key, list(s.buckets), s.count, s.total, s.db_queries, s.db_seconds)
+                for key, s in self._series.items()
+            ]
+        series.sort(key=lambda item: item[0])
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+
+        requests = [
+            "# HELP http_requests_total Requests served by route, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        durations = [
+            "# HELP http_request_duration_seconds Time to send the full response.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        db_seconds = [
+            "# HELP http_request_db_seconds_total Time spent executing queries.",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        db_queries = [
+            "# HELP http_request_db_queries_total Queries executed.",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for (method, route, status), buckets, count, total, queries, db in series:
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            requests.append(f"http_requests_total{{{labels}}} {count}")
+            cumulative = 0
+            for bound, hits in zip(bounds, buckets):
+                cumulative += hits
+                durations.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            durations.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+            durations.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+            db_seconds.append(f"http_request_db_seconds_total{{{labels}}} {db}")
+            db_queries.append(f"http_request_db_queries_total{{{labels}}} {queries}")
+
+        gauge = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+        ]
+        return "\n".join(requests + durations + db_seconds + db_queries + gauge) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and records it under its route template.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which buffers through an extra
+    task per request and would hold event streams open.
+    """
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+        self._routes: dict | None = None
+
+    def _route(self, scope) -> str:
+        # the router leaves the matched endpoint in the scope, map it back to
+        # the path template so /project/1/ and /project/2/ share a series
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if isinstance(route, Route)
+            }
+        return self._routes.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with tracking_queries() as queries:
+            self.registry.started()
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                duration = time.perf_counter() - start
+                self.registry.finished(
+                    scope["method"], self._route(scope), status, duration, queries
+                )
+
+
+class QueryHeadersMiddleware:
+    """Reports the request's query count and DB time in the response headers.
+
+    X-DB-Queries holds the count and Server-Timing the time, which browsers
+    show next to the request. For development only, the numbers say a lot
+    about the schema.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracking_queries() as queries:
+
+            async def send_with_queries(message):
+                # streamed responses start early, they report what ran so far
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(queries.count).encode()))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            f"db;dur={queries.duration * 1000:.3f}".encode(),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_queries)
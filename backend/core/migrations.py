@@ -0,0 +1,120 @@
+"""Schema changes for databases created before the models changed.
+
+``Base.metadata.create_all`` only creates missing tables, so anything added
+to an existing table (columns, indexes, constraints) also gets a migration
+here. Migrations are applied in order at startup, each one exactly once,
+and must be written so they also succeed on a freshly created schema.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from models import TASK_SEARCH_VECTOR
+
+# arbitrary key for pg_advisory_xact_lock, so only one worker migrates at a time
+MIGRATION_LOCK_ID = 7_301_944
+
+
+def _association_primary_key(table: str) -> list[str]:
+    return [
+        # the tables had no constraint, drop what would violate one
+        f"DELETE FROM {table} WHERE user_id IS NULL OR project_id IS NULL",
+        f"""
+        DELETE FROM {table} a USING {table} b
+        WHERE a.ctid < b.ctid
+          AND a.user_id = b.user_id
+          AND a.project_id = b.project_id
+        """,
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conrelid = '{table}'::regclass AND contype = 'p'
+            ) THEN
+                ALTER TABLE {table} ADD CONSTRAINT {table}_pkey
+                PRIMARY KEY (user_id, project_id);
+            END IF;
+        END $$
+        """,
+    ]
+
+
+MIGRATIONS = [
+    (
+        "0001_hot_path_indexes",
+        [
+            *_association_primary_key("project_users"),
+            *_association_primary_key("project_managers"),
+            "CREATE INDEX IF NOT EXISTS ix_project_users_project_id "
+            "ON project_users (project_id)",
+            "CREATE INDEX IF NOT EXISTS ix_project_managers_project_id "
+            "ON project_managers (project_id)",
+            "CREATE INDEX IF NOT EXISTS ix_projects_creator_id "
+            "ON projects (creator_id)",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_id_id "
+            "ON tasks (project_id, id)",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_id_status "
+            "ON tasks (project_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_id_deadline_id "
+            "ON tasks (project_id, deadline, id)",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_assignee_id_status "
+            "ON tasks (assignee_id, status)",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_created_by_id "
+            "ON tasks (created_by_id)",
+        ],
+    ),
+    (
+        "0002_project_version",
+        [
+            "ALTER TABLE projects "
+            "ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        ],
+    ),
+    (
+        "0003_task_updated_at",
+        [
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS updated_at "
+            "TIMESTAMP WITH TIME ZONE",
+            "UPDATE tasks SET updated_at = coalesce(date_of_creation, now()) "
+            "WHERE updated_at IS NULL",
+            "ALTER TABLE tasks ALTER COLUMN updated_at "
+            "SET DEFAULT statement_timestamp()",
+            "ALTER TABLE tasks ALTER COLUMN updated_at SET NOT NULL",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_id_updated_at_id "
+            "ON tasks (project_id, updated_at, id)",
+        ],
+    ),
+    (
+        "0004_task_search_vector",
+        [
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({TASK_SEARCH_VECTOR}) STORED",
+            "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector "
+            "ON tasks USING gin (search_vector)",
+        ],
+    ),
+]
+
+
+def run_migrations(engine: Engine):
+    with engine.begin() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR PRIMARY KEY, "
+                "applied_at TIMESTAMP WITH TIME ZONE DEFAULT now())"
+            )
+        )
+        applied = set(connection.scalars(text("SELECT name FROM schema_migrations")))
+        for name, statements in MIGRATIONS:
+            if name in applied:
+                continue
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                {"name": name},
+            )
@@ -0,0 +1,24 @@
+import base64
+import json
+from fastapi import HTTPException, status
+
+
+def encode_cursor(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def invalid_cursor():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor"
+    )
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise invalid_cursor()
+    if not isinstance(payload, dict):
+        raise invalid_cursor()
+    return payload
@@ -0,0 +1,79 @@
+"""Single-pass JSON responses for the routers.
+
+For a plain return value FastAPI validates it against ``response_model``,
+walks the validated models again with ``jsonable_encoder`` and encodes the
+result with the json module. ``render`` reads the response model's fields
+straight off the ORM objects or rows once and hands the result to orjson,
+which encodes datetimes and enums itself. The values come from our own
+columns, so they are not validated again.
+"""
+
+import types
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Union, get_args, get_origin
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _identity(value):
+    return value
+
+
+@lru_cache(maxsize=None)
+def _encoder(type_):
+    """Function turning a value of ``type_`` into what orjson encodes."""
+    origin = get_origin(type_)
+    if origin is list:
+        encode_item = _encoder(get_args(type_)[0])
+        return lambda values: [encode_item(value) for value in values]
+    if origin is dict:
+        encode_item = _encoder(get_args(type_)[1])
+        return lambda values: {key: encode_item(value) for key, value in values.items()}
+    if origin in (Union, types.UnionType):
+        # Optional[Model], the other unions in the schemas are of plain values
+        models = [arg for arg in get_args(type_) if arg is not type(None)]
+        if len(models) == 1:
+            encode_value = _encoder(models[0])
+            return lambda value: None if value is None else encode_value(value)
+        return _identity
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return _model_encoder(type_)
+    return _identity
+
+
+def _model_encoder(model: type[BaseModel]):
+    fields = [
+        (name, _encoder(field.outer_type_), field.get_default())
+        for name, field in model.__fields__.items()
+    ]
+
+    def encode(obj):
+        if obj is None:
+            return None
+        if isinstance(obj, BaseModel):
+            return obj.dict()
+        if isinstance(obj, Mapping):
+            return {
+                name: encode_field(obj.get(name, default))
+                for name, encode_field, default in fields
+            }
+        return {
+            name: encode_field(getattr(obj, name, default))
+            for name, encode_field, default in fields
+        }
+
+    return encode
+
+
+def render(
+    model, content, status_code: int = 200, headers: dict | None = None
+) -> ORJSONResponse:
+    """Encode ``content`` (ORM objects, rows or dicts) as ``model``.
+
+    Headers set on an injected ``Response`` don't apply to a returned
+    response, pass them here instead.
+    """
+    return ORJSONResponse(
+        _encoder(model)(content), status_code=status_code, headers=headers
+    )
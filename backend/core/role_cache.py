@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from schemas.project_schema import ProjectRole
+from core.config import ROLE_CACHE_MAX_SIZE, ROLE_CACHE_TTL_SECONDS
+
+
+class RoleCache:
+    """Size bounded LRU of (user_id, project_id) -> role with a TTL.
+
+    The cache lives in one process. Writes made through core.crud invalidate
+    it in the process that made them, other workers see the change once the
+    entry expires, so the TTL bounds how stale a role can get.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, int], tuple[ProjectRole, float]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, project_id: int) -> ProjectRole | None:
+        key = (user_id, project_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, user_id: int, project_id: int, role: ProjectRole):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, project_id)] = (role, time.monotonic() + self.ttl)
+            self._entries.move_to_end((user_id, project_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, project_id: int):
+        with self._lock:
+            self._entries.pop((user_id, project_id), None)
+
+    def invalidate_project(self, project_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == project_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+role_cache = RoleCache(ROLE_CACHE_MAX_SIZE, ROLE_CACHE_TTL_SECONDS)
@@ -1,11 +1,46 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from database import Base, engine
-from routers import user_route, project_rout, task_rout
+from core.config import METRICS_ENABLED, QUERY_DEBUG_HEADERS, USE_ASYNC_DB
+from core.events import broker
+from core.hashing import hashing_pool
+from core.jobs import runner
+from core.metrics import MetricsMiddleware, QueryHeadersMiddleware
+from core.migrations import run_migrations
+from routers import user_route, project_rout, task_rout, job_rout, internal_rout
+from routers import async_user_route, async_project_rout, async_task_rout
+from routers import async_job_rout
 
 
-app = FastAPI()
-app.include_router(user_route.router)
-app.include_router(project_rout.router)
-app.include_router(task_rout.router)
+def create_app(
+    use_async_db: bool = USE_ASYNC_DB, query_headers: bool = QUERY_DEBUG_HEADERS
+) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+    if use_async_db:
+        routers = (
+            async_user_route,
+            async_project_rout,
+            async_task_rout,
+            async_job_rout,
+        )
+    else:
+        routers = (user_route, project_rout, task_rout, job_rout)
+    for module in routers:
+        app.include_router(module.router)
+    app.include_router(internal_rout.router)
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(internal_rout.metrics_router)
+    if query_headers:
+        app.add_middleware(QueryHeadersMiddleware)
+    app.add_event_handler("startup", runner.start)
+    app.add_event_handler("shutdown", runner.stop)
+    app.add_event_handler("shutdown", broker.stop)
+    app.add_event_handler("shutdown", hashing_pool.shutdown)
+    return app
+
+
+app = create_app()
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
@@ -1,21 +1,50 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, DateTime, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Computed,
+    Integer,
+    String,
+    ForeignKey,
+    Table,
+    DateTime,
+    Enum,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from database import Base
 from enum import Enum as PythonEnum
 
+# the (user_id, project_id) primary key serves the membership checks, the
+# project_id index serves listing a project's members
 project_users = Table(
     "project_users",
     Base.metadata,
-    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
-    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
+    Column(
+        "user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    ),
+    Column(
+        "project_id",
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Index("ix_project_users_project_id", "project_id"),
 )
 
 project_managers = Table(
     "project_managers",
     Base.metadata,
-    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
-    Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE")),
+    Column(
+        "user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    ),
+    Column(
+        "project_id",
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Index("ix_project_managers_project_id", "project_id"),
 )
 
 
@@ -47,7 +76,9 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     description = Column(String)
-    creator_id = Column(Integer, ForeignKey("users.id"))
+    creator_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # bumped by every write to the project, its members or its tasks
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     creator = relationship("User", backref="created_projects")
     users = relationship("User", secondary=project_users, back_populates="my_projects")
@@ -62,18 +93,48 @@ class TaskStatus(str, PythonEnum):
     COMPLETED = "COMPLETED"
 
 
+# queries must be parsed with the same configuration, title matches rank above
+# description matches
+TASK_SEARCH_CONFIG = "english"
+TASK_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_project_id_id", "project_id", "id"),
+        Index("ix_tasks_project_id_status", "project_id", "status"),
+        Index("ix_tasks_project_id_deadline_id", "project_id", "deadline", "id"),
+        Index("ix_tasks_assignee_id_status", "assignee_id", "status"),
+        Index("ix_tasks_created_by_id", "created_by_id"),
+        Index("ix_tasks_project_id_updated_at_id", "project_id", "updated_at", "id"),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     description = Column(String)
     status = Column(Enum(TaskStatus), default=TaskStatus.IN_PROGRESS)
     date_of_creation = Column(DateTime(timezone=True), server_default=func.now())
+    # the time of the writing statement rather than of its transaction, onupdate
+    # also applies to Core UPDATE statements, so bulk updates keep it current
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.statement_timestamp(),
+        onupdate=func.statement_timestamp(),
+    )
     deadline = Column(DateTime(timezone=True))
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     created_by_id = Column(Integer, ForeignKey("users.id"))
     assignee_id = Column(Integer, ForeignKey("users.id"))
+    # only read by search conditions, so it is never loaded with the task
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(TASK_SEARCH_VECTOR, persisted=True))
+    )
 
     project = relationship("Project", foreign_keys=[project_id], back_populates="tasks")
     created_by = relationship(
@@ -82,3 +143,53 @@ class Task(Base):
     assignee = relationship(
         "User", foreign_keys=[assignee_id], back_populates="assigned_tasks"
     )
+
+
+class TaskTombstone(Base):
+    """Deleted task ids, so clients syncing changes can drop them too."""
+
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_project_id_deleted_at", "project_id", "deleted_at"),
+    )
+
+    task_id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    deleted_at = Column(
+        DateTime(timezone=True), server_default=func.statement_timestamp()
+    )
+
+
+class JobStatus(str, PythonEnum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
+class Job(Base):
+    """Work the API accepted but runs outside the request, see core.jobs."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    # a failed job waits here before its next attempt
+    run_after = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.statement_timestamp(),
+    )
+    # refreshed while the job runs, a job whose worker died is claimed again
+    # once it is older than the lease
+    locked_at = Column(DateTime(timezone=True))
+    error = Column(String)
+    created_by_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.statement_timestamp()
+    )
+    finished_at = Column(DateTime(timezone=True))
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from schemas.job_schema import JobShow
+from models import User
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from core import async_dependencies as d
+from core import async_crud
+from core.responses import render
+
+router = APIRouter(tags=["job"], prefix="/job")
+
+
+@router.get("/{job_id}", response_model=JobShow)
+async def read_job(
+    job_id: int,
+    curr_user: User = Depends(d.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await async_crud.get_job(db, job_id)
+    if job is None or job.created_by_id != curr_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return render(JobShow, job)
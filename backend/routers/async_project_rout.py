@@ -0,0 +1,245 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import EmailStr
+from schemas.project_schema import ProjectCreate, ProjectShow, ProjectDashboard
+from schemas.project_schema import MembersAdd, MembersAddResult
+from schemas.project_schema import MembersRemove, MembersRemoveResult
+from schemas.task_schema import TaskPage, TaskStats
+from schemas.job_schema import JobShow
+from models import User
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from core import async_dependencies as d
+from core import async_crud
+from core import events
+from core import jobs
+from core.bulk import check_batch_size
+from core.responses import render
+from core.etag import make_etag, not_modified
+from core.etag import matches as etag_matches
+
+router = APIRouter(tags=["project"], prefix="/project")
+
+
+@router.post("/create/", response_model=ProjectShow)
+async def create_project(
+    project: ProjectCreate,
+    curr_user: User = Depends(d.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    new_project = await async_crud.create_project(db, curr_user, project)
+    return render(ProjectShow, new_project)
+
+
+@router.put("/{project_id}/add/user", response_model=ProjectShow)
+async def project_add_user(
+    project_id: int,
+    email_to_add: EmailStr,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_to_add = await async_crud.get_user_by_email(db, email_to_add)
+    if not user_to_add:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="user don't exist"
+        )
+    if await async_crud.is_project_member(db, user_to_add.id, project_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user already exists in project",
+        )
+    return render(
+        ProjectShow, await async_crud.add_user_to_project(db, user_to_add, project_id)
+    )
+
+
+@router.put("/{project_id}/add/manager", response_model=ProjectShow)
+async def project_add_manager(
+    project_id: int,
+    email_to_add: EmailStr,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_to_add = await async_crud.get_user_by_email(db, email_to_add)
+    if not user_to_add:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="user don't exist"
+        )
+    if await async_crud.is_project_manager(db, user_to_add.id, project_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user already manager in project",
+        )
+    return render(
+        ProjectShow,
+        await async_crud.add_manager_to_project(db, user_to_add, project_id),
+    )
+
+
+@router.put("/{project_id}/add/users", response_model=MembersAddResult)
+async def project_add_users(
+    project_id: int,
+    members: MembersAdd,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not members.emails:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="nothing to add"
+        )
+    check_batch_size(members.emails)
+    return render(
+        MembersAddResult,
+        await async_crud.add_users_to_project(
+            db, project_id, members.emails, members.manager
+        ),
+    )
+
+
+@router.delete("/{project_id}/delete/user", response_model=JobShow, status_code=202)
+async def project_delete_user(
+    project_id: int,
+    email_to_delete: EmailStr,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_to_delete = await async_crud.get_user_by_email(db, email_to_delete)
+    if not user_to_delete:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="user don't exist"
+        )
+    if not (await async_crud.is_project_member(db, user_to_delete.id, project_id)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user don't exists in project",
+        )
+    return jobs.accepted(
+        await async_crud.remove_user_from_project(
+            db, user_to_delete, project_id, access.user
+        )
+    )
+
+
+@router.delete(
+    "/{project_id}/delete/users", response_model=MembersRemoveResult, status_code=202
+)
+async def project_delete_users(
+    project_id: int,
+    members: MembersRemove,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not (members.emails or members.user_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="nothing to remove"
+        )
+    check_batch_size(members.emails + members.user_ids)
+    result = await async_crud.remove_users_from_project(
+        db, project_id, members.emails, members.user_ids, access.user
+    )
+    if result["job"] is None:
+        return render(MembersRemoveResult, result)
+    return jobs.accepted(result["job"], MembersRemoveResult, result)
+
+
+@router.delete("/{project_id}/", response_model=JobShow, status_code=202)
+async def delete_project(
+    project_id: int,
+    access: d.ProjectAccess = Depends(d.get_project_owner),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return jobs.accepted(
+        await async_crud.schedule_project_deletion(db, project_id, access.user)
+    )
+
+
+@router.get("/my-projects/", response_model=list[ProjectShow])
+async def user_projects(
+    curr_user: User = Depends(d.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return render(list[ProjectShow], await async_crud.get_user_projects(db, curr_user))
+
+
+@router.get("/tasks/search", response_model=TaskPage)
+async def search_user_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    curr_user: User = Depends(d.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # across every project the caller is a member of
+    tasks, next_cursor = await async_crud.search_tasks(
+        db, q, user_id=curr_user.id, limit=limit, cursor=cursor
+    )
+    return render(TaskPage, {"items": tasks, "next_cursor": next_cursor})
+
+
+@router.get("/{project_id}/", response_model=ProjectShow)
+async def user_project(
+    project_id: int,
+    request: Request,
+    access: d.ProjectAccess = Depends(d.get_project_for_member),
+    db: AsyncSession = Depends(get_async_db),
+):
+    etag = make_etag("project", project_id, access.project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return render(
+        ProjectShow,
+        await async_crud.load_members(db, access.project),
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/{project_id}/dashboard", response_model=ProjectDashboard)
+async def project_dashboard(
+    project_id: int,
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=200),
+    access: d.ProjectAccess = Depends(d.get_project_for_member),
+    db: AsyncSession = Depends(get_async_db),
+):
+    etag = make_etag(
+        "dashboard", project_id, access.project.version, access.role, limit
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return render(
+        ProjectDashboard,
+        await async_crud.get_project_dashboard(db, access.project, access.role, limit),
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/{project_id}/stats", response_model=TaskStats)
+async def project_stats(
+    project_id: int,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return render(TaskStats, await async_crud.get_project_stats(db, project_id))
+
+
+@router.get("/{project_id}/events")
+async def project_events(
+    project_id: int,
+    access: d.ProjectAccess = Depends(d.get_project_member),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # the stream outlives the handler, give the connection back to the pool now
+    # rather than when the client disconnects
+    await db.close()
+    return StreamingResponse(
+        events.stream(project_id, access.user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from schemas.user_schema import UserCreate, UserShow
+from schemas.token_schema import Token
+from typing import Annotated
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from core import async_crud, async_dependencies, dependencies
+from core.responses import render
+from models import User
+
+router = APIRouter(tags=["user"], prefix="/user")
+
+
+@router.post("/create/", response_model=UserShow)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await async_crud.get_user_by_email(db, user.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
+        )
+    elif await async_crud.get_user_by_username(db, user.username):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="username already registered",
+        )
+    else:
+        new_user = await async_crud.create_user(db, user)
+        return render(UserShow, new_user)
+
+
+@router.post("/login/", response_model=Token)
+async def user_login(
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: AsyncSession = Depends(get_async_db),
+):
+    user = await async_dependencies.authenticate_user(
+        db, form_data.username, form_data.password
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = dependencies.create_access_token(
+        data={"sub": user.username, "uid": user.id}
+    )
+    return render(Token, {"access_token": access_token, "token_type": "bearer"})
+
+
+@router.get("/me/", response_model=UserShow)
+async def user_details(
+    curr_user: User = Depends(async_dependencies.get_current_user),
+):
+    return render(UserShow, curr_user)
@@ -0,0 +1,57 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from database import engine, async_engine
+from core.pool_stats import pool_status
+from core.role_cache import role_cache
+from core.metrics import CONTENT_TYPE, metrics
+from core import config
+
+
+def require_internal_token(authorization: str | None = Header(default=None)):
+    if config.INTERNAL_TOKEN is None:
+        # disabled, look like any other unknown path
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), config.INTERNAL_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# operational endpoints, hidden from the docs and only served to callers
+# holding INTERNAL_TOKEN
+router = APIRouter(
+    tags=["internal"],
+    prefix="/internal",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+# Prometheus scrapes /metrics by default, give it the token as bearer_token
+metrics_router = APIRouter(
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/pool")
+def connection_pools():
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.sync_engine.pool),
+    }
+
+
+@router.get("/role-cache")
+def project_role_cache():
+    return role_cache.stats()
+
+
+@metrics_router.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
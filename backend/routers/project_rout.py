@@ -1,11 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
-from schemas.project_schema import ProjectCreate, ProjectShow
+from schemas.project_schema import ProjectCreate, ProjectShow, ProjectDashboard
+from schemas.project_schema import MembersAdd, MembersAddResult
+from schemas.project_schema import MembersRemove, MembersRemoveResult
+from schemas.task_schema import TaskPage, TaskStats
+from schemas.job_schema import JobShow
 from models import User
 from sqlalchemy.orm import Session
 from database import get_db
 from core import dependencies as d
 from core import crud
+from core import events
+from core import jobs
+from core.bulk import check_batch_size
+from core.responses import render
+from core.etag import make_etag, not_modified
+from core.etag import matches as etag_matches
 
 router = APIRouter(tags=["project"], prefix="/project")
 
@@ -17,14 +35,14 @@ def create_project(
     db: Session = Depends(get_db),
 ):
     new_project = crud.create_project(db, curr_user, project)
-    return new_project
+    return render(ProjectShow, new_project)
 
 
 @router.put("/{project_id}/add/user", response_model=ProjectShow)
 def project_add_user(
     project_id: int,
     email_to_add: EmailStr,
-    curr_user: User = Depends(d.get_current_user_manager),
+    access: d.ProjectAccess = Depends(d.get_project_manager),
     db: Session = Depends(get_db),
 ):
     user_to_add = crud.get_user_by_email(db, email_to_add)
@@ -37,14 +55,14 @@ def project_add_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="user already exists in project",
         )
-    return crud.add_user_to_project(db, user_to_add, project_id)
+    return render(ProjectShow, crud.add_user_to_project(db, user_to_add, project_id))
 
 
 @router.put("/{project_id}/add/manager", response_model=ProjectShow)
 def project_add_manager(
     project_id: int,
     email_to_add: EmailStr,
-    curr_user: User = Depends(d.get_current_user_manager),
+    access: d.ProjectAccess = Depends(d.get_project_manager),
     db: Session = Depends(get_db),
 ):
     user_to_add = crud.get_user_by_email(db, email_to_add)
@@ -57,14 +75,32 @@ def project_add_manager(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="user already manager in project",
         )
-    return crud.add_manager_to_project(db, user_to_add, project_id)
+    return render(ProjectShow, crud.add_manager_to_project(db, user_to_add, project_id))
 
 
-@router.delete("/{project_id}/delete/user", response_model=ProjectShow)
+@router.put("/{project_id}/add/users", response_model=MembersAddResult)
+def project_add_users(
+    project_id: int,
+    members: MembersAdd,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: Session = Depends(get_db),
+):
+    if not members.emails:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="nothing to add"
+        )
+    check_batch_size(members.emails)
+    return render(
+        MembersAddResult,
+        crud.add_users_to_project(db, project_id, members.emails, members.manager),
+    )
+
+
+@router.delete("/{project_id}/delete/user", response_model=JobShow, status_code=202)
 def project_delete_user(
     project_id: int,
     email_to_delete: EmailStr,
-    curr_user: User = Depends(d.get_current_user_manager),
+    access: d.ProjectAccess = Depends(d.get_project_manager),
     db: Session = Depends(get_db),
 ):
     user_to_delete = crud.get_user_by_email(db, email_to_delete)
@@ -77,29 +113,116 @@ def project_delete_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="user don't exists in project",
         )
-    return crud.remove_user_from_project(db, user_to_delete, project_id)
+    return jobs.accepted(
+        crud.remove_user_from_project(db, user_to_delete, project_id, access.user)
+    )
 
 
-@router.delete("/{project_id}/")
+@router.delete(
+    "/{project_id}/delete/users", response_model=MembersRemoveResult, status_code=202
+)
+def project_delete_users(
+    project_id: int,
+    members: MembersRemove,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: Session = Depends(get_db),
+):
+    if not (members.emails or members.user_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="nothing to remove"
+        )
+    check_batch_size(members.emails + members.user_ids)
+    result = crud.remove_users_from_project(
+        db, project_id, members.emails, members.user_ids, access.user
+    )
+    if result["job"] is None:
+        return render(MembersRemoveResult, result)
+    return jobs.accepted(result["job"], MembersRemoveResult, result)
+
+
+@router.delete("/{project_id}/", response_model=JobShow, status_code=202)
 def delete_project(
     project_id: int,
-    curr_user: User = Depends(d.get_current_user_owner),
+    access: d.ProjectAccess = Depends(d.get_project_owner),
     db: Session = Depends(get_db),
 ):
-    return crud.delete_project(db, project_id)
+    return jobs.accepted(crud.schedule_project_deletion(db, project_id, access.user))
 
 
 @router.get("/my-projects/", response_model=list[ProjectShow])
 def user_projects(
     curr_user: User = Depends(d.get_current_user), db: Session = Depends(get_db)
 ):
-    return curr_user.my_projects
+    return render(list[ProjectShow], crud.get_user_projects(db, curr_user))
+
+
+@router.get("/tasks/search", response_model=TaskPage)
+def search_user_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    curr_user: User = Depends(d.get_current_user),
+    db: Session = Depends(get_db),
+):
+    # across every project the caller is a member of
+    tasks, next_cursor = crud.search_tasks(
+        db, q, user_id=curr_user.id, limit=limit, cursor=cursor
+    )
+    return render(TaskPage, {"items": tasks, "next_cursor": next_cursor})
 
 
 @router.get("/{project_id}/", response_model=ProjectShow)
 def user_project(
     project_id: int,
-    curr_user: User = Depends(d.get_current_user_member),
+    request: Request,
+    access: d.ProjectAccess = Depends(d.get_project_for_member),
+):
+    etag = make_etag("project", project_id, access.project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return render(ProjectShow, access.project, headers={"ETag": etag})
+
+
+@router.get("/{project_id}/dashboard", response_model=ProjectDashboard)
+def project_dashboard(
+    project_id: int,
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=200),
+    access: d.ProjectAccess = Depends(d.get_project_for_member),
+    db: Session = Depends(get_db),
+):
+    etag = make_etag(
+        "dashboard", project_id, access.project.version, access.role, limit
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return render(
+        ProjectDashboard,
+        crud.get_project_dashboard(db, access.project, access.role, limit),
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/{project_id}/stats", response_model=TaskStats)
+def project_stats(
+    project_id: int,
+    access: d.ProjectAccess = Depends(d.get_project_manager),
+    db: Session = Depends(get_db),
+):
+    return render(TaskStats, crud.get_project_stats(db, project_id))
+
+
+@router.get("/{project_id}/events")
+def project_events(
+    project_id: int,
+    access: d.ProjectAccess = Depends(d.get_project_member),
     db: Session = Depends(get_db),
 ):
-    return crud.get_project_by_id(db, project_id)
+    # the stream outlives the handler, give the connection back to the pool now
+    # rather than when the client disconnects
+    db.close()
+    return StreamingResponse(
+        events.stream(project_id, access.user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
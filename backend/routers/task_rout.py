@@ -1,12 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
-from schemas.task_schema import TaskCreate, TaskShow, TaskUpdate
-from models import User
+from datetime import datetime, timezone
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from schemas.task_schema import (
+    TaskCreate,
+    TaskShow,
+    TaskUpdate,
+    TaskFilter,
+    TaskSort,
+    TaskPage,
+    TaskChanges,
+    TaskBulkCreateResult,
+    TaskBulkUpdate,
+)
+from schemas.project_schema import ProjectRole
 from sqlalchemy.orm import Session
 from database import get_db
 from core import crud
-from core.dependencies import get_current_user_manager, get_current_user_member
-
+from core.bulk import check_batch_size, parse_items
+from core.dependencies import (
+    ProjectAccess,
+    get_project_manager,
+    get_project_member,
+    get_project_for_member,
+)
+from core.responses import render
+from core.etag import make_etag, not_modified
+from core.etag import matches as etag_matches
 
 router = APIRouter(tags=["task"], prefix="/project/{project_id}/task")
 
@@ -15,37 +41,152 @@ router = APIRouter(tags=["task"], prefix="/project/{project_id}/task")
 def create_task(
     project_id: int,
     task: TaskCreate,
-    curr_user: User = Depends(get_current_user_manager),
+    access: ProjectAccess = Depends(get_project_manager),
+    db: Session = Depends(get_db),
+):
+    new_task = crud.create_task(db, project_id, task, access.user)
+    return render(TaskShow, new_task)
+
+
+@router.post("/bulk", response_model=TaskBulkCreateResult)
+def create_tasks(
+    project_id: int,
+    tasks: list[dict] = Body(...),
+    partial: bool = False,
+    access: ProjectAccess = Depends(get_project_manager),
     db: Session = Depends(get_db),
 ):
-    new_task = crud.create_task(db, project_id, task, curr_user)
-    return jsonable_encoder(new_task)
+    valid, errors = parse_items(tasks, TaskCreate, partial)
+    created = crud.create_tasks(db, project_id, valid, access.user)
+    return render(TaskBulkCreateResult, {"created": created, "errors": errors})
 
 
-@router.get("/", response_model=list[TaskShow])
+@router.put("/bulk", response_model=list[TaskShow])
+def update_tasks(
+    project_id: int,
+    bulk: TaskBulkUpdate,
+    access: ProjectAccess = Depends(get_project_member),
+    db: Session = Depends(get_db),
+):
+    if bulk.task_ids is None and bulk.filter is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="select tasks with task_ids or filter",
+        )
+    if bulk.task_ids is not None:
+        check_batch_size(bulk.task_ids)
+    else:
+        # a filter can reach every task of the project
+        if access.role == ProjectRole.MEMBER:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="updating tasks by filter requires the manager role",
+            )
+        if not bulk.filter.dict(exclude_none=True):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="filter must set at least one field",
+            )
+    if not bulk.update.dict(exclude_unset=True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="nothing to update"
+        )
+    if bulk.update.assignee_id is not None:
+        if not crud.is_project_member(db, bulk.update.assignee_id, project_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Assignee must be a member of the project",
+            )
+    return render(
+        list[TaskShow],
+        crud.update_tasks(db, project_id, bulk.update, bulk.task_ids, bulk.filter),
+    )
+
+
+@router.get("/", response_model=TaskPage)
 def read_tasks(
     project_id: int,
-    curr_user: User = Depends(get_current_user_member),
+    request: Request,
+    filters: TaskFilter = Depends(),
+    sort: TaskSort = TaskSort.ID,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    access: ProjectAccess = Depends(get_project_for_member),
+    db: Session = Depends(get_db),
+):
+    etag = make_etag("tasks", project_id, access.project.version, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    tasks, next_cursor = crud.get_project_tasks(
+        db, project_id, filters, sort, limit, cursor
+    )
+    return render(
+        TaskPage, {"items": tasks, "next_cursor": next_cursor}, headers={"ETag": etag}
+    )
+
+
+@router.get("/search", response_model=TaskPage)
+def search_tasks(
+    project_id: int,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    access: ProjectAccess = Depends(get_project_member),
+    db: Session = Depends(get_db),
+):
+    tasks, next_cursor = crud.search_tasks(
+        db, q, project_id=project_id, limit=limit, cursor=cursor
+    )
+    return render(TaskPage, {"items": tasks, "next_cursor": next_cursor})
+
+
+@router.get("/changes", response_model=TaskChanges)
+def read_task_changes(
+    project_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=200, ge=1, le=1000),
+    access: ProjectAccess = Depends(get_project_member),
     db: Session = Depends(get_db),
 ):
-    return crud.get_project_tasks(db, project_id)
+    if since is None and cursor is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="pass since or the next_cursor of the previous sync",
+        )
+    if since is not None and since.tzinfo is None:
+        # no UTC offset given, read it as UTC
+        since = since.replace(tzinfo=timezone.utc)
+    return render(
+        TaskChanges, crud.get_task_changes(db, project_id, since, cursor, limit)
+    )
 
 
 @router.get("/{task_id}", response_model=TaskShow)
 def read_task(
     project_id: int,
     task_id: int,
-    curr_user: User = Depends(get_current_user_member),
+    request: Request,
+    access: ProjectAccess = Depends(get_project_for_member),
     db: Session = Depends(get_db),
 ):
-    return jsonable_encoder(crud.get_project_task(db, project_id, task_id))
+    etag = make_etag("task", project_id, task_id, access.project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    task = crud.get_project_task(db, project_id, task_id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found in the project",
+        )
+    return render(TaskShow, task, headers={"ETag": etag})
 
 
 @router.delete("/{task_id}")
 def delete_task(
     project_id: int,
     task_id: int,
-    curr_user: User = Depends(get_current_user_manager),
+    access: ProjectAccess = Depends(get_project_manager),
     db: Session = Depends(get_db),
 ):
     task = crud.get_project_task(db, project_id, task_id)
@@ -62,7 +203,7 @@ def update_task(
     project_id: int,
     task_id: int,
     task_data: TaskUpdate,
-    curr_user: User = Depends(get_current_user_member),
+    access: ProjectAccess = Depends(get_project_member),
     db: Session = Depends(get_db),
 ):
     if task_data.assignee_id is not None:
@@ -77,4 +218,4 @@ def update_task(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found in the project",
         )
-    return jsonable_encoder(updated_task)
+    return render(TaskShow, updated_task)
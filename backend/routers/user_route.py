@@ -6,6 +6,7 @@ from typing import Annotated
 from sqlalchemy.orm import Session
 from database import get_db
 from core import crud, dependencies
+from core.responses import render
 from models import User
 
 router = APIRouter(tags=["user"], prefix="/user")
@@ -24,7 +25,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     else:
         new_user = crud.create_user(db, user)
-        return new_user
+        return render(UserShow, new_user)
 
 
 @router.post("/login/", response_model=Token)
@@ -39,10 +40,12 @@ def user_login(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = dependencies.create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = dependencies.create_access_token(
+        data={"sub": user.username, "uid": user.id}
+    )
+    return render(Token, {"access_token": access_token, "token_type": "bearer"})
 
 
 @router.get("/me/", response_model=UserShow)
 def user_details(curr_user: User = Depends(dependencies.get_current_user)):
-    return curr_user
+    return render(UserShow, curr_user)
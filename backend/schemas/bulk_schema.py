@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class BulkItemError(BaseModel):
+    index: int
+    errors: list[dict]
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from enum import Enum
+from datetime import datetime
+
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
+class JobShow(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    attempts: int
+    # the last failure, kept while the job waits to be retried
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        orm_mode = True
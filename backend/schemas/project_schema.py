@@ -1,5 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr
+from enum import Enum
 from schemas.user_schema import UserShow
+from schemas.task_schema import TaskPage, TaskStatus
+from schemas.job_schema import JobShow
+
+
+class ProjectRole(str, Enum):
+    MEMBER = "member"
+    MANAGER = "manager"
+    OWNER = "owner"
 
 
 class ProjectBase(BaseModel):
@@ -19,3 +28,50 @@ class ProjectShow(ProjectBase):
 
     class Config:
         orm_mode = True
+
+
+class ProjectDashboard(BaseModel):
+    project: ProjectShow
+    role: ProjectRole
+    # the first page of each status, the next pages come from the task list
+    # filtered by that status
+    tasks: dict[TaskStatus, TaskPage]
+
+
+class MembersAdd(BaseModel):
+    emails: list[EmailStr]
+    # add them as managers, which makes them members as well
+    manager: bool = False
+
+
+class MembersRemove(BaseModel):
+    emails: list[EmailStr] = []
+    user_ids: list[int] = []
+
+
+class MemberOutcome(str, Enum):
+    ADDED = "added"
+    ALREADY_MEMBER = "already_member"
+    ALREADY_MANAGER = "already_manager"
+    REMOVED = "removed"
+    NOT_FOUND = "not_found"
+    NOT_MEMBER = "not_member"
+    OWNER = "owner"
+
+
+class MemberResult(BaseModel):
+    # one per requested email, then one per requested id, in request order
+    email: str | None = None
+    user_id: int | None = None
+    outcome: MemberOutcome
+
+
+class MembersAddResult(BaseModel):
+    results: list[MemberResult]
+
+
+class MembersRemoveResult(BaseModel):
+    results: list[MemberResult]
+    # clears the removed users from the project's tasks, None when nobody was
+    # removed
+    job: JobShow | None = None
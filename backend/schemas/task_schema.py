@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from enum import Enum
 from datetime import datetime
+from schemas.bulk_schema import BulkItemError
 
 
 class TaskStatus(str, Enum):
@@ -21,6 +22,7 @@ class TaskShow(TaskCreate):
     created_by_id: int | None = None
     assignee_id: int | None = None
     date_of_creation: datetime
+    updated_at: datetime
 
     class Config:
         orm_mode = True
@@ -32,3 +34,56 @@ class TaskUpdate(BaseModel):
     status: TaskStatus | None = None
     deadline: datetime | None = None
     assignee_id: int | None = None
+
+
+class TaskFilter(BaseModel):
+    status: TaskStatus | None = None
+    assignee_id: int | None = None
+    created_by_id: int | None = None
+    deadline_from: datetime | None = None
+    deadline_to: datetime | None = None
+
+
+class TaskSort(str, Enum):
+    ID = "id"
+    ID_DESC = "-id"
+    DEADLINE = "deadline"
+    DEADLINE_DESC = "-deadline"
+
+
+class TaskPage(BaseModel):
+    items: list[TaskShow]
+    next_cursor: str | None = None
+
+
+class TaskChanges(BaseModel):
+    changed: list[TaskShow]
+    deleted: list[int]
+    next_cursor: str
+    has_more: bool = False
+
+
+class AssigneeWorkload(BaseModel):
+    assignee_id: int | None
+    in_progress: int = 0
+    completed: int = 0
+    overdue: int = 0
+
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: dict[TaskStatus, int]
+    overdue: int
+    # unassigned tasks are counted under assignee_id None
+    workload: list[AssigneeWorkload]
+
+
+class TaskBulkCreateResult(BaseModel):
+    created: list[TaskShow]
+    errors: list[BulkItemError] = []
+
+
+class TaskBulkUpdate(BaseModel):
+    task_ids: list[int] | None = None
+    filter: TaskFilter | None = None
+    update: TaskUpdate
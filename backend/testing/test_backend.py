@@ -1,16 +1,46 @@
+import asyncio
+import json
 import pytest
+from contextlib import contextmanager
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base, get_db
-from main import app
-from datetime import datetime
-from core.config import SQLALCHEMY_TEST_DATABASE_URL
+from sqlalchemy.pool import NullPool
+from database import Base, get_db, get_async_db
+from main import app, create_app
+from datetime import datetime, timedelta, timezone
+from core.role_cache import role_cache
+from core.hashing import HashingPool, _hash, hashing_pool
+from core.events import EventBroker, stream
+from core import config, crud, jobs
+from passlib.context import CryptContext
+from models import User, Project, Task, TaskStatus, JobStatus
+from schemas.project_schema import ProjectDashboard, ProjectRole, ProjectShow
+from core.responses import render
+from core.metrics import metrics
+from core.config import (
+    SQLALCHEMY_TEST_DATABASE_URL,
+    SQLALCHEMY_ASYNC_TEST_DATABASE_URL,
+)
 
 
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs the app on its own event loop, so pooled asyncpg connections
+# can't be shared between requests
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_TEST_DATABASE_URL, poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+async_app = create_app(use_async_db=True)
+
 
 Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
@@ -38,13 +68,70 @@ def session():
 
 
 @pytest.fixture()
-def client(session):
+def sync_client(session):
     def override_get_db():
         yield session
 
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    role_cache.clear()
+
+
+@pytest.fixture()
+def async_client():
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    yield TestClient(async_app)
+    del async_app.dependency_overrides[get_async_db]
+    role_cache.clear()
+
+    # the async stack commits for real, so clean up behind it
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} CASCADE"))
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+@pytest.fixture()
+def internal_headers(monkeypatch):
+    monkeypatch.setattr(config, "INTERNAL_TOKEN", "internal-secret")
+    return {"Authorization": "Bearer internal-secret"}
+
+
+@contextmanager
+def count_queries():
+    # every engine, so the async stack is counted as well
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+@pytest.fixture()
+def max_queries():
+    """Fail when the block runs more than ``limit`` queries, listing them."""
+
+    @contextmanager
+    def check(limit):
+        with count_queries() as statements:
+            yield statements
+        assert len(statements) <= limit, "\n\n".join(statements)
+
+    return check
 
 
 user_data = {"email": "test@test.com", "username": "testuser", "password": "testpass"}
@@ -90,6 +177,15 @@ def create_task(client, project_id, token, task_data=task_data):
     return response
 
 
+def run_jobs(client, session, runner=None) -> int:
+    # the sync client's writes only exist inside the test session's transaction
+    runner = runner or jobs.JobRunner(TestingSessionLocal)
+    if client.app is app:
+        return runner.run_pending(session)
+    with TestingSessionLocal() as db:
+        return runner.run_pending(db)
+
+
 def test_create_user(client):
     response = create_user(client)
     assert response.status_code == 200
@@ -155,3 +251,946 @@ def test_create_task(client):
     assert task_response.json()["project_id"] == project_response.json()["id"]
     assert task_response.json()["created_by_id"] == user_response.json()["id"]
     assert task_response.json()["assignee_id"] is None
+
+
+def test_pool_stats(client, internal_headers):
+    response = client.get("/internal/pool", headers=internal_headers)
+    assert response.status_code == 200
+    for pool in ("sync", "async"):
+        stats = response.json()[pool]
+        assert {"size", "checked_out", "idle", "overflow", "wait"} <= stats.keys()
+        assert {"checkouts", "timeouts", "avg_wait_ms"} <= stats["wait"].keys()
+
+
+def test_internal_routes_require_token(client, monkeypatch):
+    paths = ("/internal/pool", "/internal/role-cache", "/metrics")
+    for path in paths:
+        assert client.get(path).status_code == 404
+    monkeypatch.setattr(config, "INTERNAL_TOKEN", "internal-secret")
+    for path in paths:
+        assert client.get(path).status_code == 401
+        response = client.get(path, headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == 401
+        response = client.get(path, headers={"Authorization": "Bearer internal-secret"})
+        assert response.status_code == 200
+
+
+def test_metrics(client, internal_headers):
+    create_user(client)
+    token = login(client)
+    project_id = create_project(client, token).json()["id"]
+    metrics.clear()
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(f"/project/{project_id}/", headers=headers)
+    client.get(f"/project/{project_id + 1}/", headers=headers)
+    client.get("/no/such/path")
+
+    response = client.get("/metrics", headers=internal_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = dict(
+        line.rsplit(" ", 1)
+        for line in response.text.splitlines()
+        if not line.startswith("#")
+    )
+    labels = 'method="GET",route="/project/{project_id}/",status="200"'
+    assert samples[f"http_requests_total{{{labels}}}"] == "1"
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == "1"
+    assert int(samples[f"http_request_db_queries_total{{{labels}}}"]) > 0
+    assert float(samples[f"http_request_db_seconds_total{{{labels}}}"]) > 0
+    labels = 'method="GET",route="/project/{project_id}/",status="403"'
+    assert samples[f"http_requests_total{{{labels}}}"] == "1"
+    labels = 'method="GET",route="unmatched",status="404"'
+    assert samples[f"http_requests_total{{{labels}}}"] == "1"
+    # the scrape itself is still in flight
+    assert samples["http_requests_in_flight"] == "1"
+
+
+def test_read_tasks_paginated(client):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    deadlines = ["2023-05-12T10:00", None, "2023-05-10T10:00", "2023-05-12T10:00"]
+    task_ids = []
+    for i, deadline in enumerate(deadlines):
+        status = "COMPLETED" if i == 0 else "IN_PROGRESS"
+        data = {**task_data, "deadline": deadline, "status": status}
+        task_ids.append(create_task(client, project_id, token, data).json()["id"])
+
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "deadline", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(
+            f"/project/{project_id}/task/", params=params, headers=headers
+        )
+        assert response.status_code == 200
+        assert len(response.json()["items"]) <= 2
+        seen += [task["id"] for task in response.json()["items"]]
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [task_ids[2], task_ids[0], task_ids[3], task_ids[1]]
+
+    response = client.get(
+        f"/project/{project_id}/task/",
+        params={"status": "IN_PROGRESS", "sort": "-id"},
+        headers=headers,
+    )
+    assert [task["id"] for task in response.json()["items"]] == task_ids[:0:-1]
+
+    response = client.get(
+        f"/project/{project_id}/task/", params={"cursor": "nope"}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_role_cache_invalidated_on_removal(client, internal_headers):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    create_user(client, user2_data)
+    token = login(client)
+    token2 = login(client, user2_data)
+    project_id = create_project(client, token).json()["id"]
+    client.put(
+        f"/project/{project_id}/add/user",
+        params={"email_to_add": user2_data["email"]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    for _ in range(2):
+        response = client.get(
+            f"/project/{project_id}/", headers={"Authorization": f"Bearer {token2}"}
+        )
+        assert response.status_code == 200
+    response = client.get("/internal/role-cache", headers=internal_headers)
+    assert response.json()["hits"] >= 1
+
+    client.delete(
+        f"/project/{project_id}/delete/user",
+        params={"email_to_delete": user2_data["email"]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response = client.get(
+        f"/project/{project_id}/", headers={"Authorization": f"Bearer {token2}"}
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_login_rehashes_outdated_cost(client, session):
+    create_user(client)
+    user = session.query(User).filter_by(email=user_data["email"]).one()
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(
+        user_data["password"]
+    )
+    user.hashed_password = old_hash
+    session.commit()
+
+    login(client)
+    session.refresh(user)
+    assert user.hashed_password != old_hash
+    login(client)
+
+
+def test_hashing_pool_rejects_when_saturated():
+    pool = HashingPool(workers=1, queue_limit=0)
+    try:
+        in_flight = pool.submit(_hash, "password")
+        with pytest.raises(HTTPException) as error:
+            pool.submit(_hash, "password")
+        assert error.value.status_code == 503
+        in_flight.result()
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_pool_lifecycle():
+    pool = HashingPool(workers=1, queue_limit=0)
+    try:
+        assert pool.submit(_hash, "password").result()
+        assert pool._executor._mp_context.get_start_method() == "forkserver"
+    finally:
+        pool.shutdown()
+    assert pool._executor is None
+    for application in (app, async_app):
+        assert hashing_pool.shutdown in application.router.on_shutdown
+
+
+def test_create_tasks_bulk(client):
+    user_response = create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    tasks = [
+        {**task_data, "title": "first"},
+        {"description": "no title"},
+        {**task_data, "title": "third"},
+    ]
+
+    response = client.post(
+        f"/project/{project_id}/task/bulk", json=tasks, headers=headers
+    )
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+
+    response = client.post(
+        f"/project/{project_id}/task/bulk",
+        json=tasks,
+        params={"partial": True},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    created = response.json()["created"]
+    assert [task["title"] for task in created] == ["first", "third"]
+    assert all(task["project_id"] == project_id for task in created)
+    assert created[0]["created_by_id"] == user_response.json()["id"]
+    assert [error["index"] for error in response.json()["errors"]] == [1]
+
+    response = client.get(f"/project/{project_id}/task/", headers=headers)
+    assert len(response.json()["items"]) == 2
+
+
+def test_update_tasks_bulk(client):
+    user_response = create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    task_ids = [create_task(client, project_id, token).json()["id"] for _ in range(3)]
+    user_id = user_response.json()["id"]
+
+    response = client.put(
+        f"/project/{project_id}/task/bulk",
+        json={"task_ids": task_ids[:2], "update": {"assignee_id": user_id}},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert sorted(task["id"] for task in response.json()) == task_ids[:2]
+
+    response = client.put(
+        f"/project/{project_id}/task/bulk",
+        json={
+            "filter": {"status": "IN_PROGRESS", "assignee_id": user_id},
+            "update": {"status": "COMPLETED"},
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert sorted(task["id"] for task in response.json()) == task_ids[:2]
+
+    response = client.get(
+        f"/project/{project_id}/task/",
+        params={"status": "IN_PROGRESS"},
+        headers=headers,
+    )
+    assert [task["id"] for task in response.json()["items"]] == task_ids[2:]
+
+    response = client.put(
+        f"/project/{project_id}/task/bulk",
+        json={"task_ids": task_ids, "update": {"assignee_id": user_id + 1000}},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+def test_update_tasks_bulk_by_filter_is_bounded(client, monkeypatch):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    create_user(client, user2_data)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    client.put(
+        f"/project/{project_id}/add/user",
+        params={"email_to_add": user2_data["email"]},
+        headers=headers,
+    )
+    for _ in range(3):
+        create_task(client, project_id, token)
+    url = f"/project/{project_id}/task/bulk"
+    change = {"update": {"status": "COMPLETED"}}
+
+    response = client.put(url, json={"filter": {}, **change}, headers=headers)
+    assert response.status_code == 400
+    token2 = login(client, user2_data)
+    response = client.put(
+        url,
+        json={"filter": {"status": "IN_PROGRESS"}, **change},
+        headers={"Authorization": f"Bearer {token2}"},
+    )
+    assert response.status_code == 403
+    monkeypatch.setattr(crud, "BULK_MAX_ITEMS", 2)
+    response = client.put(
+        url, json={"filter": {"status": "IN_PROGRESS"}, **change}, headers=headers
+    )
+    assert response.status_code == 413
+    response = client.get(
+        f"/project/{project_id}/task/", params={"status": "COMPLETED"}, headers=headers
+    )
+    assert response.json()["items"] == []
+
+
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+def test_project_reads_use_constant_queries(client):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    create_user(client, user2_data)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def add_project():
+        project_id = create_project(client, token).json()["id"]
+        client.put(
+            f"/project/{project_id}/add/manager",
+            params={"email_to_add": user2_data["email"]},
+            headers=headers,
+        )
+        return project_id
+
+    def queries(url):
+        with count_queries() as statements:
+            assert client.get(url, headers=headers).status_code == 200
+        return len(statements)
+
+    project_id = add_project()
+    one_project = queries("/project/my-projects/")
+    detail = queries(f"/project/{project_id}/")
+    dashboard = queries(f"/project/{project_id}/dashboard")
+    for _ in range(3):
+        add_project()
+    user3_data = {"email": "test3@test.com", "username": "user3", "password": "pass"}
+    create_user(client, user3_data)
+    client.put(
+        f"/project/{project_id}/add/user",
+        params={"email_to_add": user3_data["email"]},
+        headers=headers,
+    )
+    for task_status in ("IN_PROGRESS", "COMPLETED", "COMPLETED"):
+        create_task(client, project_id, token, {**task_data, "status": task_status})
+    assert queries("/project/my-projects/") == one_project
+    assert queries(f"/project/{project_id}/") == detail
+    assert queries(f"/project/{project_id}/dashboard") == dashboard
+
+    response = client.get(f"/project/{project_id}/dashboard", headers=headers)
+    body = response.json()
+    assert body["role"] == "owner"
+    assert len(body["project"]["users"]) == 3
+    assert len(body["tasks"]["IN_PROGRESS"]["items"]) == 1
+    assert len(body["tasks"]["COMPLETED"]["items"]) == 2
+
+
+# upper bounds for the reads of a project with members and tasks, an N+1
+# regression grows with the data and trips them
+QUERY_BUDGETS = {
+    "/project/my-projects/": 4,
+    "/project/{project_id}/": 3,
+    "/project/{project_id}/dashboard": 5,
+    "/project/{project_id}/stats": 2,
+    "/project/{project_id}/task/": 2,
+    "/project/{project_id}/task/{task_id}": 2,
+    "/project/{project_id}/task/search?q=test": 2,
+    "/user/me/": 1,
+}
+
+
+def test_query_budgets(client, max_queries):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    create_user(client, user2_data)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(3):
+        project_id = create_project(client, token).json()["id"]
+        client.put(
+            f"/project/{project_id}/add/user",
+            params={"email_to_add": user2_data["email"]},
+            headers=headers,
+        )
+        for _ in range(5):
+            task_id = create_task(client, project_id, token).json()["id"]
+
+    for path, budget in QUERY_BUDGETS.items():
+        url = path.format(project_id=project_id, task_id=task_id)
+        with max_queries(budget):
+            assert client.get(url, headers=headers).status_code == 200
+
+
+def test_query_headers(session):
+    def override_get_db():
+        yield session
+
+    debug_app = create_app(query_headers=True)
+    debug_app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(debug_app)
+    create_user(client)
+    token = login(client)
+    project_id = create_project(client, token).json()["id"]
+
+    with count_queries() as statements:
+        response = client.get(
+            f"/project/{project_id}/", headers={"Authorization": f"Bearer {token}"}
+        )
+    assert response.status_code == 200
+    assert response.headers["X-DB-Queries"] == str(len(statements))
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    role_cache.clear()
+
+
+def test_conditional_get(client):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    task_id = create_task(client, project_id, token).json()["id"]
+
+    for url in [
+        f"/project/{project_id}/",
+        f"/project/{project_id}/dashboard",
+        f"/project/{project_id}/task/",
+        f"/project/{project_id}/task/{task_id}",
+    ]:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        client.put(
+            f"/project/{project_id}/task/{task_id}",
+            json={"title": url},
+            headers=headers,
+        )
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    all_tasks = client.get(f"/project/{project_id}/task/", headers=headers)
+    one_task = client.get(
+        f"/project/{project_id}/task/", params={"limit": 1}, headers=headers
+    )
+    assert all_tasks.headers["etag"] != one_task.headers["etag"]
+
+
+def test_task_changes(client):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    url = f"/project/{project_id}/task/changes"
+    started = datetime.now(timezone.utc) - timedelta(minutes=1)
+    task_ids = [create_task(client, project_id, token).json()["id"] for _ in range(3)]
+
+    assert client.get(url, headers=headers).status_code == 400
+    # deletions from before the retention window may be gone
+    response = client.get(
+        url, params={"since": "2000-01-01T00:00:00Z"}, headers=headers
+    )
+    assert response.status_code == 410
+
+    response = client.get(
+        url, params={"since": started.isoformat(), "limit": 2}, headers=headers
+    )
+    assert response.status_code == 200
+    page = response.json()
+    assert [task["id"] for task in page["changed"]] == task_ids[:2]
+    assert page["has_more"]
+
+    page = client.get(
+        url, params={"cursor": page["next_cursor"]}, headers=headers
+    ).json()
+    assert [task["id"] for task in page["changed"]] == task_ids[2:]
+    assert not page["has_more"]
+
+    client.put(
+        f"/project/{project_id}/task/{task_ids[0]}",
+        json={"title": "changed"},
+        headers=headers,
+    )
+    client.delete(f"/project/{project_id}/task/{task_ids[1]}", headers=headers)
+    page = client.get(
+        url, params={"cursor": page["next_cursor"]}, headers=headers
+    ).json()
+    changed = {task["id"]: task for task in page["changed"]}
+    assert changed[task_ids[0]]["title"] == "changed"
+    assert task_ids[1] not in changed
+    assert page["deleted"] == [task_ids[1]]
+
+    # no UTC offset, read as UTC
+    since = started.replace(tzinfo=None).isoformat()
+    response = client.get(url, params={"since": since}, headers=headers)
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["changed"]] == [
+        task_ids[2],
+        task_ids[0],
+    ]
+
+
+def test_task_changes_page_deletions(client, monkeypatch):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    url = f"/project/{project_id}/task/changes"
+    started = datetime.now(timezone.utc) - timedelta(minutes=1)
+    task_ids = [create_task(client, project_id, token).json()["id"] for _ in range(4)]
+    for task_id in task_ids[:3]:
+        client.delete(f"/project/{project_id}/task/{task_id}", headers=headers)
+
+    pages = []
+    params = {"since": started.isoformat(), "limit": 2}
+    while True:
+        page = client.get(url, params=params, headers=headers).json()
+        pages.append((page["changed"], page["deleted"]))
+        if not page["has_more"]:
+            break
+        params = {"cursor": page["next_cursor"], "limit": 2}
+    assert [len(changed) + len(deleted) for changed, deleted in pages] == [2, 2]
+    assert [task_id for _, deleted in pages for task_id in deleted] == task_ids[:3]
+
+    # the next delete prunes tombstones past the retention window, and a sync
+    # from before it has to start over
+    retention = crud.TOMBSTONE_RETENTION
+    monkeypatch.setattr(crud, "TOMBSTONE_RETENTION", timedelta(0))
+    client.delete(f"/project/{project_id}/task/{task_ids[3]}", headers=headers)
+    assert client.get(url, params=params, headers=headers).status_code == 410
+    since = {"since": started.isoformat()}
+    assert client.get(url, params=since, headers=headers).status_code == 410
+    monkeypatch.setattr(crud, "TOMBSTONE_RETENTION", retention)
+    page = client.get(url, params=since, headers=headers).json()
+    assert page["deleted"] == task_ids[3:]
+
+
+def test_project_events(async_client):
+    create_user(async_client)
+    token = login(async_client)
+    project_id = create_project(async_client, token).json()["id"]
+
+    async def scenario():
+        broker = EventBroker(SQLALCHEMY_TEST_DATABASE_URL)
+        try:
+            async with broker.subscribe(project_id) as queue:
+                task_id = create_task(async_client, project_id, token).json()["id"]
+                event = await asyncio.wait_for(queue.get(), timeout=5)
+                assert event == {
+                    "project_id": project_id,
+                    "type": "task.created",
+                    "task_id": task_id,
+                }
+
+            body = stream(project_id, user_id=7, broker=broker)
+            assert await body.__anext__() == ": connected\n\n"
+            removed = {"project_id": project_id, "type": "member.removed"}
+            broker.publish({**removed, "user_id": 7})
+            assert (await body.__anext__()).startswith("event: member.removed\n")
+            with pytest.raises(StopAsyncIteration):
+                await body.__anext__()
+        finally:
+            await broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_search_tasks(client):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_ids = [create_project(client, token).json()["id"] for _ in range(2)]
+    titles = ["Fix login bug", "Write docs", "Style the login page"]
+    for title in titles:
+        create_task(client, project_ids[0], token, {**task_data, "title": title})
+    create_task(
+        client,
+        project_ids[1],
+        token,
+        {**task_data, "title": "Docs", "description": "mention the login flow"},
+    )
+
+    url = f"/project/{project_ids[0]}/task/search"
+    response = client.get(url, params={"q": "login", "limit": 1}, headers=headers)
+    assert response.status_code == 200
+    first = response.json()
+    assert len(first["items"]) == 1
+    second = client.get(
+        url,
+        params={"q": "login", "limit": 1, "cursor": first["next_cursor"]},
+        headers=headers,
+    ).json()
+    found = {task["title"] for task in first["items"] + second["items"]}
+    assert found == {"Fix login bug", "Style the login page"}
+    assert second["next_cursor"] is None
+
+    response = client.get(
+        "/project/tasks/search", params={"q": "login"}, headers=headers
+    )
+    items = response.json()["items"]
+    assert len(items) == 3
+    # a title match ranks above a description match
+    assert items[-1]["title"] == "Docs"
+
+
+def test_search_tasks_pages_through_tied_ranks(client):
+    create_user(client)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    task_ids = [
+        create_task(
+            client,
+            project_id,
+            token,
+            {**task_data, "title": f"task {i}", "description": "reindex the archive"},
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    url = f"/project/{project_id}/task/search"
+    params = {"q": "archive", "limit": 1}
+    seen = []
+    while True:
+        page = client.get(url, params=params, headers=headers).json()
+        seen += [task["id"] for task in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        params = {**params, "cursor": page["next_cursor"]}
+    assert seen == task_ids[::-1]
+
+
+def test_project_stats(client):
+    user = create_user(client).json()
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    future = {**task_data, "deadline": "2999-01-01T00:00"}
+    completed = {**task_data, "status": "COMPLETED"}
+    for data in (task_data, task_data, future, completed):
+        task_id = create_task(client, project_id, token, data).json()["id"]
+    client.put(
+        f"/project/{project_id}/task/{task_id}",
+        json={"assignee_id": user["id"]},
+        headers=headers,
+    )
+
+    response = client.get(f"/project/{project_id}/stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["total"] == 4
+    assert stats["by_status"] == {"IN_PROGRESS": 3, "COMPLETED": 1}
+    assert stats["overdue"] == 2
+    workload = {row["assignee_id"]: row for row in stats["workload"]}
+    assert workload[None] == {
+        "assignee_id": None,
+        "in_progress": 3,
+        "completed": 0,
+        "overdue": 2,
+    }
+    assert workload[user["id"]]["completed"] == 1
+
+
+def test_render_matches_default_encoding():
+    user = User(id=1, username="user", email="user@test.com")
+    project = Project(id=2, title="title", description=None, creator_id=1)
+    project.users.append(user)
+    project.managers.append(user)
+    tasks = [
+        Task(
+            id=3,
+            title="task",
+            status=TaskStatus.COMPLETED,
+            date_of_creation=datetime(2023, 5, 1, 12),
+            updated_at=datetime(2023, 5, 2, 12),
+            project_id=2,
+        )
+    ]
+    content = {
+        "project": project,
+        "role": ProjectRole.OWNER,
+        "tasks": {"COMPLETED": {"items": tasks}, "IN_PROGRESS": {"items": []}},
+    }
+    expected = ProjectDashboard.parse_obj(
+        {**content, "project": ProjectShow.from_orm(project)}
+    )
+    body = render(ProjectDashboard, content).body
+    assert json.loads(body) == json.loads(json.dumps(jsonable_encoder(expected)))
+
+
+def test_delete_project_in_background(client, session, monkeypatch):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    create_user(client, user2_data)
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    for _ in range(5):
+        create_task(client, project_id, token)
+
+    response = client.delete(f"/project/{project_id}/", headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "project.delete"
+    assert job["status"] == "QUEUED"
+    assert response.headers["location"] == f"/job/{job['id']}"
+    # asking twice doesn't queue the work twice
+    response = client.delete(f"/project/{project_id}/", headers=headers)
+    assert response.json()["id"] == job["id"]
+    token2 = login(client, user2_data)
+    response = client.get(
+        f"/job/{job['id']}", headers={"Authorization": f"Bearer {token2}"}
+    )
+    assert response.status_code == 404
+
+    monkeypatch.setattr(jobs, "JOB_CHUNK_SIZE", 2)
+    assert run_jobs(client, session) == 1
+    job = client.get(f"/job/{job['id']}", headers=headers).json()
+    assert job["status"] == "SUCCEEDED"
+    assert job["attempts"] == 1
+    assert job["finished_at"] is not None
+    assert client.get(f"/project/{project_id}/", headers=headers).status_code == 403
+    assert client.get("/project/my-projects/", headers=headers).json() == []
+
+
+def test_cached_role_of_deleted_project(client, session):
+    user_id = create_user(client).json()["id"]
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    task_id = create_task(client, project_id, token).json()["id"]
+    client.delete(f"/project/{project_id}/", headers=headers)
+    run_jobs(client, session)
+    # the deleting worker cleared its cache, another one may still hold the role
+    role_cache.set(user_id, project_id, ProjectRole.OWNER)
+
+    for path in ("", "dashboard", f"task/{task_id}"):
+        response = client.get(f"/project/{project_id}/{path}", headers=headers)
+        assert response.status_code == 404
+
+
+def test_remove_user_in_background(client, session):
+    user2_data = {"email": "test2@test.com", "username": "user2", "password": "pass"}
+    create_user(client)
+    user2 = create_user(client, user2_data).json()
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    client.put(
+        f"/project/{project_id}/add/manager",
+        params={"email_to_add": user2_data["email"]},
+        headers=headers,
+    )
+    created = create_task(client, project_id, login(client, user2_data)).json()
+    assigned = create_task(client, project_id, token).json()
+    client.put(
+        f"/project/{project_id}/task/{assigned['id']}",
+        json={"assignee_id": user2["id"]},
+        headers=headers,
+    )
+
+    response = client.delete(
+        f"/project/{project_id}/delete/user",
+        params={"email_to_delete": user2_data["email"]},
+        headers=headers,
+    )
+    assert response.status_code == 202
+    assert response.json()["kind"] == "project.unassign_users"
+    # the membership goes with the request, the tasks with the job
+    project = client.get(f"/project/{project_id}/", headers=headers).json()
+    assert user2["id"] not in [user["id"] for user in project["users"]]
+    assert user2["id"] not in [user["id"] for user in project["managers"]]
+    url = f"/project/{project_id}/task/{assigned['id']}"
+    assert client.get(url, headers=headers).json()["assignee_id"] == user2["id"]
+
+    assert run_jobs(client, session) == 1
+    assert client.get(url, headers=headers).json()["assignee_id"] is None
+    url = f"/project/{project_id}/task/{created['id']}"
+    assert client.get(url, headers=headers).json()["created_by_id"] is None
+    job = client.get(response.headers["location"], headers=headers).json()
+    assert job["status"] == "SUCCEEDED"
+
+
+def test_remove_users_bulk(client, session, max_queries):
+    emails = [f"user{i}@test.com" for i in range(2, 5)]
+    create_user(client)
+    ids = [
+        create_user(
+            client, {"email": email, "username": email, "password": "pass"}
+        ).json()["id"]
+        for email in emails
+    ]
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project = create_project(client, token).json()
+    project_id = project["id"]
+    client.put(
+        f"/project/{project_id}/add/manager",
+        params={"email_to_add": emails[0]},
+        headers=headers,
+    )
+    client.put(
+        f"/project/{project_id}/add/user",
+        params={"email_to_add": emails[1]},
+        headers=headers,
+    )
+    task_id = create_task(client, project_id, token).json()["id"]
+    client.put(
+        f"/project/{project_id}/task/{task_id}",
+        json={"assignee_id": ids[1]},
+        headers=headers,
+    )
+
+    body = {
+        "emails": [emails[0], emails[2], "nobody@test.com"],
+        "user_ids": [ids[1], project["creator_id"]],
+    }
+    with max_queries(12):
+        response = client.request(
+            "DELETE", f"/project/{project_id}/delete/users", json=body, headers=headers
+        )
+    assert response.status_code == 202
+    result = response.json()
+    assert [item["outcome"] for item in result["results"]] == [
+        "removed",
+        "not_member",
+        "not_found",
+        "removed",
+        "owner",
+    ]
+    assert result["results"][3] == {
+        "email": emails[1],
+        "user_id": ids[1],
+        "outcome": "removed",
+    }
+    assert response.headers["location"] == f"/job/{result['job']['id']}"
+    project = client.get(f"/project/{project_id}/", headers=headers).json()
+    assert [user["id"] for user in project["users"]] == [project["creator_id"]]
+    assert [user["id"] for user in project["managers"]] == [project["creator_id"]]
+
+    assert run_jobs(client, session) == 1
+    url = f"/project/{project_id}/task/{task_id}"
+    assert client.get(url, headers=headers).json()["assignee_id"] is None
+
+    # nobody left to remove, nothing is queued
+    response = client.request(
+        "DELETE", f"/project/{project_id}/delete/users", json=body, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["job"] is None
+
+
+def test_add_users_bulk(client, max_queries):
+    emails = [f"user{i}@test.com" for i in range(2, 5)]
+    create_user(client)
+    ids = [
+        create_user(
+            client, {"email": email, "username": email, "password": "pass"}
+        ).json()["id"]
+        for email in emails
+    ]
+    token = login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    project_id = create_project(client, token).json()["id"]
+    client.put(
+        f"/project/{project_id}/add/user",
+        params={"email_to_add": emails[0]},
+        headers=headers,
+    )
+    url = f"/project/{project_id}/add/users"
+
+    with max_queries(8):
+        response = client.put(
+            url, json={"emails": [*emails, "nobody@test.com"]}, headers=headers
+        )
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"email": emails[0], "user_id": ids[0], "outcome": "already_member"},
+        {"email": emails[1], "user_id": ids[1], "outcome": "added"},
+        {"email": emails[2], "user_id": ids[2], "outcome": "added"},
+        {"email": "nobody@test.com", "user_id": None, "outcome": "not_found"},
+    ]
+
+    managers = {"emails": emails[1:], "manager": True}
+    response = client.put(url, json=managers, headers=headers)
+    assert [item["outcome"] for item in response.json()["results"]] == ["added"] * 2
+    response = client.put(url, json=managers, headers=headers)
+    assert [item["outcome"] for item in response.json()["results"]] == [
+        "already_manager"
+    ] * 2
+
+    project = client.get(f"/project/{project_id}/", headers=headers).json()
+    assert sorted(user["id"] for user in project["users"]) == [
+        project["creator_id"],
+        *ids,
+    ]
+    assert sorted(user["id"] for user in project["managers"]) == [
+        project["creator_id"],
+        *ids[1:],
+    ]
+    token2 = login(client, {"email": emails[2], "password": "pass"})
+    response = client.get(
+        f"/project/{project_id}/stats", headers={"Authorization": f"Bearer {token2}"}
+    )
+    assert response.status_code == 200
+
+
+def test_failed_job_is_retried(session, monkeypatch):
+    calls = []
+
+    def flaky(db):
+        calls.append(len(calls))
+        if len(calls) < 3:
+            raise RuntimeError("try again")
+        yield
+
+    monkeypatch.setitem(jobs.HANDLERS, "test.flaky", flaky)
+    user = User(email="job@test.com", username="job", hashed_password="x")
+    session.add(user)
+    session.flush()
+    job = crud.add_job(session, "test.flaky", user)
+    session.commit()
+
+    runner = jobs.JobRunner(TestingSessionLocal, retry_delay=0, max_attempts=2)
+    assert runner.run_pending(session) == 2
+    session.refresh(job)
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 2
+    assert job.error == "RuntimeError"
+
+    job.status = JobStatus.QUEUED
+    session.commit()
+    runner = jobs.JobRunner(TestingSessionLocal, retry_delay=0, max_attempts=5)
+    assert runner.run_pending(session) == 1
+    session.refresh(job)
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.attempts == 3
+    assert job.error is None
+
+
+def test_abandoned_job_is_retried_up_to_max_attempts(session, monkeypatch):
+    calls = []
+
+    def noop(db):
+        calls.append(True)
+        yield
+
+    monkeypatch.setitem(jobs.HANDLERS, "test.noop", noop)
+    user = User(email="job@test.com", username="job", hashed_password="x")
+    session.add(user)
+    session.flush()
+    # both were running on a worker that died an hour ago
+    stale = [crud.add_job(session, "test.noop", user) for _ in range(2)]
+    for job, attempts in zip(stale, (1, 2)):
+        job.status = JobStatus.RUNNING
+        job.attempts = attempts
+        job.locked_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    session.commit()
+
+    runner = jobs.JobRunner(TestingSessionLocal, max_attempts=2, lease_seconds=60)
+    assert runner.run_pending(session) == 1
+    assert len(calls) == 1
+    for job in stale:
+        session.refresh(job)
+    assert [job.status for job in stale] == [JobStatus.SUCCEEDED, JobStatus.FAILED]
+    assert stale[1].attempts == 2
+    assert stale[1].finished_at is not None
@@ -0,0 +1,103 @@
+import os
+import time
+import httpx
+import streamlit as st
+
+BACKEND_URL = os.getenv("BACKEND_URL")
+BACKEND_SCHEME = os.getenv("BACKEND_SCHEME", "http")
+# HTTP/2 is negotiated over TLS only, so it needs BACKEND_SCHEME=https
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() == "true"
+# how long a GET is answered from the session without asking the backend, after
+# that it is revalidated with its ETag
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+
+
+@st.cache_resource
+def _client() -> httpx.Client:
+    # one connection pool for every session of the process, so reruns reuse
+    # kept-alive connections instead of opening one per request
+    return httpx.Client(
+        base_url=f"{BACKEND_SCHEME}://{BACKEND_URL}",
+        http2=BACKEND_HTTP2,
+        limits=httpx.Limits(
+            max_connections=50, max_keepalive_connections=20, keepalive_expiry=30
+        ),
+        timeout=httpx.Timeout(10.0, connect=3.0),
+    )
+
+
+def _headers() -> dict:
+    if "token" not in st.session_state:
+        return {}
+    return {"Authorization": f"Bearer {st.session_state.token}"}
+
+
+def _cache() -> dict:
+    # path -> query -> (expires, etag, body), kept per token so a new login
+    # never sees another user's responses
+    caches = st.session_state.setdefault("api_cache", {})
+    return caches.setdefault(st.session_state.get("token"), {})
+
+
+def get(path: str, params: dict | None = None) -> httpx.Response:
+    """GET answered from the session cache while it is fresh.
+
+    Stale entries are revalidated with their ETag, a 304 refreshes the entry
+    and is returned as a regular 200 response, so callers don't need to know
+    about caching.
+    """
+    entries = _cache().setdefault(path, {})
+    query = str(httpx.QueryParams(params))
+    cached = entries.get(query)
+    if cached is not None and cached[0] > time.monotonic():
+        return httpx.Response(200, json=cached[2])
+
+    headers = _headers()
+    if cached is not None and cached[1] is not None:
+        headers["If-None-Match"] = cached[1]
+    response = _client().get(path, params=params, headers=headers)
+    if response.status_code == 304 and cached is not None:
+        etag, body = cached[1], cached[2]
+        response = httpx.Response(200, json=body, request=response.request)
+    elif response.status_code == 200:
+        etag, body = response.headers.get("etag"), response.json()
+    else:
+        return response
+    entries[query] = (time.monotonic() + CACHE_TTL_SECONDS, etag, body)
+    return response
+
+
+def invalidate(*paths: str) -> None:
+    """Drop the cached responses of these paths, whatever their query."""
+    cache = _cache()
+    for path in paths:
+        cache.pop(path, None)
+
+
+def _mutate(method: str, path: str, invalidates, **kwargs) -> httpx.Response:
+    response = _client().request(method, path, headers=_headers(), **kwargs)
+    if response.is_success:
+        invalidate(*invalidates)
+    return response
+
+
+def post(
+    path: str,
+    json=None,
+    data: dict | None = None,
+    params: dict | None = None,
+    invalidates: tuple[str, ...] = (),
+) -> httpx.Response:
+    return _mutate("POST", path, invalidates, json=json, data=data, params=params)
+
+
+def put(
+    path: str, json=None, params: dict | None = None, invalidates: tuple[str, ...] = ()
+) -> httpx.Response:
+    return _mutate("PUT", path, invalidates, json=json, params=params)
+
+
+def delete(
+    path: str, params: dict | None = None, invalidates: tuple[str, ...] = ()
+) -> httpx.Response:
+    return _mutate("DELETE", path, invalidates, params=params)
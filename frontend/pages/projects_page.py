@@ -1,12 +1,9 @@
 import streamlit as st
-import httpx
+import api
 from sidebar import authenticated, not_authenticated
 from dateutil.parser import parse
 from streamlit_extras.switch_page_button import switch_page
 import time
-import os
-
-BACKEND_URL = os.getenv("BACKEND_URL")
 
 st.set_page_config(page_title="my projects", layout="wide")
 
@@ -19,55 +16,79 @@ def set_specific_project(id) -> None:
 
 
 def delete_project(project_id) -> None:
-    response = httpx.delete(
-        url=f"http://{BACKEND_URL}/project/{project_id}/",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
+    response = api.delete(
+        f"/project/{project_id}/",
+        invalidates=(
+            "/project/my-projects/",
+            f"/project/{project_id}/",
+            f"/project/{project_id}/dashboard",
+            f"/project/{project_id}/task/",
+        ),
     )
-    if response.status_code != 200:
+    if response.status_code == 202:
+        # the tasks go first, the project disappears once they are gone
+        st.info("The project is being deleted.")
+    else:
         st.error(response.json()["detail"])
 
 
 def remove_task(project_id, task_id) -> None:
-    response = httpx.delete(
-        url=f"http://{BACKEND_URL}/project/{project_id}/task/{task_id}",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
+    response = api.delete(
+        f"/project/{project_id}/task/{task_id}",
+        invalidates=(
+            f"/project/{project_id}/dashboard",
+            f"/project/{project_id}/task/",
+        ),
     )
     if response.status_code != 200:
         st.error(response.json()["detail"])
 
 
 def remove_user(project_id, email) -> None:
-    response = httpx.delete(
-        url=f"http://{BACKEND_URL}/project/{project_id}/delete/user?email_to_delete={email}",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
+    # the membership goes right away, the removed user's tasks lose their
+    # creator and assignee in the background
+    response = api.delete(
+        f"/project/{project_id}/delete/user",
+        params={"email_to_delete": email},
+        invalidates=(
+            f"/project/{project_id}/",
+            f"/project/{project_id}/dashboard",
+            f"/project/{project_id}/task/",
+        ),
     )
-    if response.status_code != 200:
+    if response.status_code != 202:
         st.error(response.json()["detail"])
 
 
-def add_user(porject_id, email) -> None:
-    response = httpx.put(
-        url=f"http://{BACKEND_URL}/project/{porject_id}/add/user?email_to_add={email}",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
+def add_users(project_id, emails, manager=False) -> None:
+    response = api.put(
+        f"/project/{project_id}/add/users",
+        json={"emails": emails, "manager": manager},
+        invalidates=(f"/project/{project_id}/", f"/project/{project_id}/dashboard"),
     )
     if response.status_code != 200:
         st.error(response.json()["detail"])
-
-
-def add_manager(porject_id, email) -> None:
-    response = httpx.put(
-        url=f"http://{BACKEND_URL}/project/{porject_id}/add/manager?email_to_add={email}",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
-    )
-    if response.status_code != 200:
-        st.error(response.json()["detail"])
-
-
-def is_manager(user_id, project) -> bool:
-    for manager in project["managers"]:
-        if manager["id"] == user_id:
-            return True
-    return False
+        return
+    for result in response.json()["results"]:
+        if result["outcome"] != "added":
+            st.warning(f"{result['email']}: {result['outcome'].replace('_', ' ')}")
+
+
+def get_tasks(project_id, pages) -> list | None:
+    # the dashboard holds the first page of each status, follow the rest
+    tasks = []
+    for task_status, page in pages.items():
+        tasks += page["items"]
+        params = {"status": task_status, "limit": 200}
+        while page["next_cursor"] is not None:
+            params["cursor"] = page["next_cursor"]
+            response = api.get(f"/project/{project_id}/task/", params=params)
+            if response.status_code != 200:
+                st.error(response.json()["detail"])
+                return None
+            page = response.json()
+            tasks += page["items"]
+    return tasks
 
 
 def create_project_form() -> None:
@@ -78,10 +99,10 @@ def create_project_form() -> None:
         submitted = st.form_submit_button("Submit")
         if submitted:
             del st.session_state.create_button
-            response = httpx.post(
-                url=f"http://{BACKEND_URL}/project/create/",
+            response = api.post(
+                "/project/create/",
                 json={"title": title_val, "description": description_val},
-                headers={"Authorization": f"Bearer {st.session_state.token}"},
+                invalidates=("/project/my-projects/",),
             )
             if response.status_code == 200:
                 st.success("project created")
@@ -98,15 +119,18 @@ def manager_util_form() -> None:
     )
     if option:
         with col.form("manager utils", clear_on_submit=True):
-            user_email = st.text_input("user email")
+            user_email = st.text_input("user email, several can be added at once")
             submitted = st.form_submit_button("Submit")
             if submitted:
                 if user_email != "":
+                    emails = user_email.replace(",", " ").split()
                     match option:
                         case "add user":
-                            add_user(st.session_state.selected_project, user_email)
+                            add_users(st.session_state.selected_project, emails)
                         case "add manager":
-                            add_manager(st.session_state.selected_project, user_email)
+                            add_users(
+                                st.session_state.selected_project, emails, manager=True
+                            )
                         case "delete user":
                             remove_user(st.session_state.selected_project, user_email)
                 else:
@@ -153,6 +177,9 @@ def display_task(task, users, curr_tab) -> None:
             cols[4].write(users[task["created_by_id"]]["username"])
         if task["assignee_id"] == None:
             cols[5].write("not assigned")
+        elif task["assignee_id"] not in users:
+            # removed from the project, the task is unassigned in the background
+            cols[5].write("removed user")
         else:
             cols[5].write(users[task["assignee_id"]]["username"])
         task_id = task["id"]
@@ -212,10 +239,7 @@ elif st.session_state.selected_project == 0:
     if pressed or st.session_state.create_button:
         create_project_form()
 
-    response = httpx.get(
-        url=f"http://{BACKEND_URL}/project/my-projects/",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
-    )
+    response = api.get("/project/my-projects/")
     if response.status_code == 200:
         display_projects(response.json())
     else:
@@ -229,13 +253,11 @@ else:
 
     id = st.session_state.selected_project
 
-    project_details = httpx.get(
-        url=f"http://{BACKEND_URL}/project/{id}/",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
-    )
-    if project_details.status_code == 200:
-        project_details = project_details.json()
-        st.session_state.is_manager = is_manager(st.session_state.id, project_details)
+    dashboard = api.get(f"/project/{id}/dashboard")
+    if dashboard.status_code == 200:
+        dashboard = dashboard.json()
+        project_details = dashboard["project"]
+        st.session_state.is_manager = dashboard["role"] in ("manager", "owner")
         users = {
             user["id"]: {"email": user["email"], "username": user["username"]}
             for user in project_details["users"]
@@ -255,12 +277,8 @@ else:
                 st.session_state.task_mode = "create"
                 switch_page("task_page")
 
-        tasks = httpx.get(
-            url=f"http://{BACKEND_URL}/project/{id}/task/",
-            headers={"Authorization": f"Bearer {st.session_state.token}"},
-        )
-        if tasks.status_code == 200:
-            tasks = tasks.json()
+        tasks = get_tasks(id, dashboard["tasks"])
+        if tasks is not None:
             tabs = st.tabs(["in progress", "completed"])
             for tab in tabs:
                 cols = tab.columns((1, 2, 1, 1, 1, 1, 1))
@@ -281,5 +299,3 @@ else:
                 else:
                     curr_tab = tabs[1]
                 display_task(task, users, curr_tab)
-        else:
-            st.error(tasks.json()["detail"])
@@ -1,13 +1,10 @@
-import httpx
 import streamlit as st
+import api
 from streamlit_extras.switch_page_button import switch_page
 from dateutil.parser import parse
 from datetime import datetime
 from sidebar import authenticated
 import time
-import os
-
-BACKEND_URL = os.getenv("BACKEND_URL")
 
 
 def task_update():
@@ -43,8 +40,8 @@ def task_update():
         project_id = task["project_id"]
         task_id = task["id"]
         deadline = datetime.combine(task_deadline_date, task_deadline_time)
-        response = httpx.put(
-            url=f"http://{BACKEND_URL}/project/{project_id}/task/{task_id}",
+        response = api.put(
+            f"/project/{project_id}/task/{task_id}",
             json={
                 "title": task_title,
                 "description": task_description,
@@ -52,7 +49,10 @@ def task_update():
                 "deadline": deadline.isoformat(),
                 "assignee_id": task_assignee,
             },
-            headers={"Authorization": f"Bearer {st.session_state.token}"},
+            invalidates=(
+                f"/project/{project_id}/dashboard",
+                f"/project/{project_id}/task/",
+            ),
         )
         if response.status_code == 200:
             st.success("updated")
@@ -78,15 +78,18 @@ def task_create():
     if submitted:
         if task_title != "" or task_description != "":
             deadline = datetime.combine(task_deadline_date, task_deadline_time)
-            response = httpx.post(
-                url=f"http://{BACKEND_URL}/project/{st.session_state.selected_project}/task/",
+            response = api.post(
+                f"/project/{st.session_state.selected_project}/task/",
                 json={
                     "title": task_title,
                     "description": task_description,
                     "status": task_status,
                     "deadline": deadline.isoformat(),
                 },
-                headers={"Authorization": f"Bearer {st.session_state.token}"},
+                invalidates=(
+                    f"/project/{st.session_state.selected_project}/dashboard",
+                    f"/project/{st.session_state.selected_project}/task/",
+                ),
             )
             if response.status_code == 200:
                 st.success("task created")
@@ -1,16 +1,12 @@
 import streamlit as st
-import httpx
+import api
 from streamlit_extras.switch_page_button import switch_page
 from st_pages import hide_pages
-import os
-
-BACKEND_URL = os.getenv("BACKEND_URL")
 
 
 def _login(password_val, email_val) -> None:
-    response = httpx.post(
-        url=f"http://{BACKEND_URL}/user/login/",
-        data={"username": email_val, "password": password_val},
+    response = api.post(
+        "/user/login/", data={"username": email_val, "password": password_val}
     )
     if response.status_code == 200:
         st.session_state["token"] = response.json()["access_token"]
@@ -44,8 +40,8 @@ def _register_form() -> None:
         submitted = st.form_submit_button("Submit")
         if submitted:
             if password_val != "" and email_val != "" and username_val != "":
-                response = httpx.post(
-                    url=f"http://{BACKEND_URL}/user/create/",
+                response = api.post(
+                    "/user/create/",
                     json={
                         "email": email_val,
                         "username": username_val,
@@ -88,10 +84,7 @@ def authenticated() -> None:
     logout_pressed = st.sidebar.button(label="LogOut")
     if logout_pressed:
         _logout()
-    response = httpx.get(
-        url=f"http://{BACKEND_URL}/user/me/",
-        headers={"Authorization": f"Bearer {st.session_state.token}"},
-    )
+    response = api.get("/user/me/")
     if response.status_code == 200:
         st.session_state.username = response.json()["username"]
         st.session_state.email = response.json()["email"]